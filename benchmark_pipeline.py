@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the Conversation Analysis pipeline
+
+Record the demo conversations once against Together AI:
+    python benchmark_pipeline.py --record
+
+Then replay them without a key or network, with simulated provider latency:
+    python benchmark_pipeline.py --latency-ms 800 --error-rate 0.02 --runs 5
+"""
+
+import argparse
+import statistics
+import time
+from config import LLM_RECORD_PATH
+from demo_data import get_all_demo_conversations
+from llm_backends import RecordingBackend, ReplayBackend, TogetherBackend
+from llm_service import LLMService
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def run_benchmark(service, runs):
+    """Run the pipeline over every demo conversation `runs` times; return per-analysis seconds"""
+    conversations = [demo['conversation'] for demo in get_all_demo_conversations().values()]
+    timings = []
+    for _ in range(runs):
+        for conversation in conversations:
+            start = time.perf_counter()
+            service.run_analysis_pipeline(conversation)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    """Parse arguments, run the benchmark and print a latency summary"""
+    parser = argparse.ArgumentParser(description="Benchmark the Conversation Analysis pipeline")
+    parser.add_argument('--record', action='store_true', help="Call Together AI and record completions")
+    parser.add_argument('--recordings', default=LLM_RECORD_PATH, help="JSONL file of recorded completions")
+    parser.add_argument('--runs', type=int, default=3, help="Passes over the demo conversations")
+    parser.add_argument('--mode', choices=['staged', 'full_report'], default='staged')
+    parser.add_argument('--sequential', action='store_true', help="Disable concurrent stages")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Median simulated latency per call")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Log-normal spread of simulated latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a simulated 503")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.record:
+        backend = RecordingBackend(TogetherBackend(), args.recordings)
+    else:
+        backend = ReplayBackend(
+            args.recordings, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+            error_rate=args.error_rate, seed=args.seed
+        )
+
+    service = LLMService(concurrent_pipeline=not args.sequential, analysis_mode=args.mode, backend=backend)
+
+    start = time.perf_counter()
+    timings = run_benchmark(service, 1 if args.record else args.runs)
+    elapsed = time.perf_counter() - start
+
+    print(f"🚀 Pipeline benchmark ({backend.name}, {args.mode}, {'sequential' if args.sequential else 'concurrent'})")
+    print("=" * 60)
+    print(f"   Analyses:   {len(timings)}")
+    print(f"   Mean:       {statistics.mean(timings) * 1000:.1f} ms")
+    print(f"   p50:        {percentile(timings, 0.50) * 1000:.1f} ms")
+    print(f"   p95:        {percentile(timings, 0.95) * 1000:.1f} ms")
+    print(f"   Throughput: {len(timings) / elapsed:.2f} analyses/s")
+
+    print("\n📊 Per-task metrics:")
+    for row in service.metrics.summary_rows():
+        if row['calls'] or row['fallbacks']:
+            print(f"   {row['task']:<22} calls={row['calls']:<4} p50≤{row['p50_s']}s p95≤{row['p95_s']}s "
+                  f"fallbacks={row['fallbacks']} parse_failures={row['parse_failures']}")
+    service.export_metrics()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Streamlit app
+
+Renders each page once in a fresh interpreter (via Streamlit's AppTest) and
+reports how long the page took, how much of that was spent importing
+modules, and which heavy libraries it loaded:
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 5 --json startup_times.json
+Run it with TOGETHER_API_KEY set: without a key the LLM backend (and the
+together SDK) is never built, so a page that loads it looks cheaper than it is.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from config import APP_PAGES, TOGETHER_API_KEY
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'leadscore.py')
+HEAVY_MODULES = ('pandas', 'numpy', 'plotly', 'textblob', 'nltk', 'together')
+PAGE_MARKER = '--- page run starts ---'
+
+# Runs in the child interpreter; `-X importtime` logs every import to stderr
+PAGE_RUNNER = '''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.session_state["page"] = {page!r}
+before = set(sys.modules)
+print({marker!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app.run()
+seconds = time.perf_counter() - start
+loaded = sorted(name for name in set(sys.modules) - before if name in {heavy!r})
+print(json.dumps({{"seconds": seconds, "loaded": loaded, "errors": [str(e.value) for e in app.exception]}}))
+'''
+
+def page_import_seconds(importtime_log):
+    """Sum the cumulative time of top-level imports logged after the page run started"""
+    total_us = 0
+    started = False
+    for line in importtime_log.splitlines():
+        if line == PAGE_MARKER:
+            started = True
+        elif started and line.startswith('import time:'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # Nested imports are indented under the import that triggered them
+            if cumulative.strip().isdigit() and not name.startswith('  '):
+                total_us += int(cumulative)
+    return total_us / 1_000_000
+
+def run_page(page):
+    """Render one page in a fresh interpreter; return its timings"""
+    code = PAGE_RUNNER.format(app=APP_PATH, page=page, marker=PAGE_MARKER, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats['import_seconds'] = page_import_seconds(result.stderr)
+    return stats
+
+def main():
+    """Benchmark every page and print a per-page summary"""
+    parser = argparse.ArgumentParser(description="Benchmark cold start of each app page")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters per page")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    print("🚀 Cold-start benchmark (fresh interpreter per run)")
+    if not TOGETHER_API_KEY:
+        print("⚠️  TOGETHER_API_KEY is not set, so the LLM backend's import cost is not measured")
+    print("=" * 60)
+    for page in APP_PAGES:
+        runs = [run_page(page) for _ in range(args.runs)]
+        results[page] = {
+            'render_seconds': statistics.median(run['seconds'] for run in runs),
+            'import_seconds': statistics.median(run['import_seconds'] for run in runs),
+            'heavy_modules': runs[-1]['loaded'],
+            'errors': runs[-1]['errors']
+        }
+        summary = results[page]
+        print(f"   {page:<24} render {summary['render_seconds']:.2f}s  "
+              f"imports {summary['import_seconds']:.2f}s  loads: {', '.join(summary['heavy_modules']) or '-'}")
+        for error in summary['errors']:
+            print(f"      ❌ {error}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
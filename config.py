@@ -8,6 +8,16 @@ load_dotenv()
 TOGETHER_API_KEY = os.getenv('TOGETHER_API_KEY')
 TOGETHER_MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
 
+# LLM backend: 'together', 'record' (Together + append every exchange to
+# LLM_RECORD_PATH) or 'replay' (serve recorded completions offline)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'together')
+LLM_RECORD_PATH = os.getenv('LLM_RECORD_PATH', 'llm_recordings.jsonl')
+LLM_REPLAY_PATH = os.getenv('LLM_REPLAY_PATH', 'llm_recordings.jsonl')
+# Simulated provider behaviour for the replay backend
+LLM_REPLAY_LATENCY_MS = float(os.getenv('LLM_REPLAY_LATENCY_MS', '0'))
+LLM_REPLAY_LATENCY_SIGMA = float(os.getenv('LLM_REPLAY_LATENCY_SIGMA', '0.5'))
+LLM_REPLAY_ERROR_RATE = float(os.getenv('LLM_REPLAY_ERROR_RATE', '0'))
+
 # Model parameters
 DEFAULT_MODEL_PARAMS = {
     'temperature': 0.7,
@@ -16,12 +26,106 @@ DEFAULT_MODEL_PARAMS = {
     'top_k': 50
 }
 
+# Concurrency settings
+# Thread pool shared by all sessions using the cached LLMService
+LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '8'))
+# Generate insights alongside scoring/coaching instead of one call after another
+LLM_CONCURRENT_PIPELINE = os.getenv('LLM_CONCURRENT_PIPELINE', 'true').lower() == 'true'
+# Default worker count for LLMService.score_many bulk scoring
+LLM_BATCH_CONCURRENCY = int(os.getenv('LLM_BATCH_CONCURRENCY', '4'))
+
+# Analysis mode: 'staged' (one call per result), 'full_report' (one call for everything)
+# or 'cascade' (keyword scoring first, the LLM only for leads it cannot call)
+LLM_ANALYSIS_MODE = os.getenv('LLM_ANALYSIS_MODE', 'staged')
+# Cascade mode: keyword lead scores inside this band (inclusive) are ambiguous and
+# escalate to the LLM, run in CASCADE_LLM_MODE; scores outside it are answered locally
+CASCADE_UNCERTAINTY_BAND = (
+    float(os.getenv('CASCADE_BAND_LOW', '40')),
+    float(os.getenv('CASCADE_BAND_HIGH', '70'))
+)
+CASCADE_LLM_MODE = os.getenv('CASCADE_LLM_MODE', 'staged')
+# The full report returns four sections, so it needs a larger completion budget
+FULL_REPORT_MAX_TOKENS = 3072
+
+# Stream JSON completions and stop generating once the JSON value is complete
+LLM_STREAM_JSON = os.getenv('LLM_STREAM_JSON', 'true').lower() == 'true'
+
+# Input token budget per prompt; long transcripts are trimmed to fit
+PROMPT_TOKEN_BUDGETS = {
+    'conversation_analysis': 6000,
+    'lead_scoring': 2000,
+    'coaching': 3000,
+    'insights': 6000,
+    'follow_up_email': 6000,
+    'full_report': 6000
+}
+
+# Resilience for Together API calls
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+# Capped exponential backoff for transient errors (timeouts, rate limits, 5xx)
+LLM_RETRY_POLICY = {
+    'max_attempts': 3,
+    'base_delay': 0.5,
+    'max_delay': 4.0
+}
+# Skip the provider entirely for a cool-down window after repeated failures
+LLM_CIRCUIT_BREAKER = {
+    'failure_threshold': 5,
+    'cooldown_seconds': 60
+}
+
+# Latency histogram bucket bounds (seconds) for LLM metrics
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+# Optional export paths for LLM metrics (Prometheus textfile / JSON snapshot)
+LLM_METRICS_PROM_PATH = os.getenv('LLM_METRICS_PROM_PATH')
+LLM_METRICS_JSON_PATH = os.getenv('LLM_METRICS_JSON_PATH')
+
+# LLM response cache (on-disk, shared across Streamlit sessions)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.llm_cache.sqlite3')
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Skip cache lookups (fresh completions are still stored)
+LLM_CACHE_BYPASS = os.getenv('LLM_CACHE_BYPASS', 'false').lower() == 'true'
+
+# Pages of the Streamlit app, in sidebar order
+APP_PAGES = ["Dashboard", "Conversation Analysis", "Lead Scoring", "Coaching Hub", "Performance Analytics"]
+
+# Keyword lexicon for LeadAnalyzer ({"version": ..., "categories": {category: [phrases]}});
+# edits are picked up without restarting the app
+KEYWORD_LEXICON_PATH = os.getenv(
+    'KEYWORD_LEXICON_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keyword_lexicon.json')
+)
+
+# Sentiment engine for the keyword-based LeadAnalyzer: 'textblob', or 'lexicon'
+# for the built-in scorer (much faster, no NLTK corpora needed)
+SENTIMENT_ENGINE = os.getenv('SENTIMENT_ENGINE', 'textblob')
+# TextBlob's English sentiment lexicon for the 'lexicon' engine; regenerate with `python sentiment.py`
+SENTIMENT_LEXICON_PATH = os.getenv(
+    'SENTIMENT_LEXICON_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.json')
+)
+
+# Optional distilled model (.npz from train_distilled_model.py) that gives LeadAnalyzer
+# LLM-style lead scores and Low/Medium/High labels instead of keyword scoring
+LEAD_SCORING_MODEL = os.getenv('LEAD_SCORING_MODEL') or None
+
+# Saved analysis history (SQLite); the old CSV history is imported on first use
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', 'conversation_history.sqlite3')
+HISTORY_CSV_PATH = os.getenv('HISTORY_CSV_PATH', 'conversation_analysis_history.csv')
+# Optional Parquet archive of the history (needs pyarrow); when set, the history view
+# reads archived analyses from it and only newer ones from the database
+HISTORY_ARCHIVE_PATH = os.getenv('HISTORY_ARCHIVE_PATH') or None
+# The history browser stops counting matches for a picked date here and shows "N+"
+HISTORY_COUNT_LIMIT = int(os.getenv('HISTORY_COUNT_LIMIT', '10000'))
+
 # Available models for different tasks (using actual model names)
 MODELS = {
     'conversation_analysis': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
     'lead_scoring': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
     'coaching': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
-    'insights': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo'
+    'insights': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
+    'follow_up_email': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
+    'full_report': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo'
 }
 
 # Alternative models if the above are not available
@@ -29,5 +133,7 @@ ALTERNATIVE_MODELS = {
     'conversation_analysis': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
     'lead_scoring': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
     'coaching': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
-    'insights': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo'
+    'insights': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
+    'follow_up_email': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo',
+    'full_report': 'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo'
 } 
\ No newline at end of file
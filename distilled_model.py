@@ -0,0 +1,284 @@
+import json
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# LLM labels the model learns: Low/Medium/High fields are softmax heads, the 0-100 lead score a logistic head
+CATEGORY_LABELS = ('buying_intent', 'urgency_level', 'engagement_level')
+SCORE_LABEL = 'lead_score'
+
+_WORD_PATTERN = re.compile(r"\w+(?:'\w+)?")
+
+def _hash_grams(words: List[str], n_features: int, ngram_range: Tuple[int, int], new_from: int = 0) -> np.ndarray:
+    """Buckets of the word n-grams that end at or after words[new_from]"""
+    low, high = ngram_range
+    grams = [
+        ' '.join(words[i:i + n])
+        for n in range(low, high + 1)
+        for i in range(max(0, new_from - n + 1), len(words) - n + 1)
+    ]
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.int64, count=len(grams)) % n_features
+
+def hash_features(texts: Iterable[str], n_features: int, ngram_range: Tuple[int, int] = (1, 2)):
+    """Hash word n-grams of each text into a sparse row-per-text matrix.
+
+    Returns CSR arrays (indptr, indices, values). Counts are log-scaled and
+    each row is L2-normalized, so long and short transcripts are comparable.
+    Hashing uses CRC32, which is stable across processes (unlike hash()).
+    """
+    indptr = [0]
+    indices = []
+    values = []
+    for text in texts:
+        buckets = _hash_grams(_WORD_PATTERN.findall(text.lower()), n_features, ngram_range)
+        if len(buckets):
+            row_indices, counts = np.unique(buckets, return_counts=True)
+            row_values = np.log1p(counts)
+            row_values /= np.sqrt(np.dot(row_values, row_values))
+            indices.append(row_indices)
+            values.append(row_values)
+        indptr.append(indptr[-1] + (len(indices[-1]) if len(buckets) else 0))
+    return (
+        np.asarray(indptr, dtype=np.int64),
+        np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+        np.concatenate(values).astype(np.float32) if values else np.empty(0, dtype=np.float32)
+    )
+
+def _sparse_dot(features, weights: np.ndarray) -> np.ndarray:
+    """Rows of a CSR matrix times a dense (n_features, k) weight matrix"""
+    indptr, indices, values = features
+    result = np.zeros((len(indptr) - 1, weights.shape[1]), dtype=np.float64)
+    nonempty = np.diff(indptr) > 0
+    if nonempty.any():
+        result[nonempty] = np.add.reduceat(values[:, None] * weights[indices], indptr[:-1][nonempty])
+    return result
+
+def _sparse_gradient(features, errors: np.ndarray, n_features: int) -> np.ndarray:
+    """Transpose of a CSR matrix times per-row errors: the weight gradient"""
+    indptr, indices, values = features
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return np.stack([
+        np.bincount(indices, weights=values * errors[rows, k], minlength=n_features)
+        for k in range(errors.shape[1])
+    ], axis=1)
+
+def _select_rows(features, rows: np.ndarray):
+    """A CSR matrix holding only the given rows"""
+    indptr, indices, values = features
+    lengths = np.diff(indptr)[rows]
+    spans = [np.arange(indptr[row], indptr[row + 1]) for row in rows]
+    positions = np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+    return np.concatenate([[0], np.cumsum(lengths)]), indices[positions], values[positions]
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-logits))
+
+class DistilledLeadModel:
+    """Logistic regression on hashed n-grams, trained to reproduce LLM labels.
+
+    Each Low/Medium/High label is a softmax head and the lead score a
+    logistic head on score/100; all heads share one hashed feature space.
+    Training is full-batch Adam on sparse features, in NumPy only. A
+    prediction is a few hundred CRC32 hashes and a sparse dot product, so
+    leads can be labelled offline in well under a millisecond.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, ngram_range: Tuple[int, int] = (1, 2)):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        # label -> (classes or None for the score, weights (n_features, k), bias (k,))
+        self.heads = {}
+        self.trained_on = 0
+
+    def features(self, texts: Iterable[str]):
+        return hash_features(texts, self.n_features, self.ngram_range)
+
+    def fit(self, texts: Sequence[str], labels: Dict[str, Sequence[Any]], epochs: int = 200,
+            learning_rate: float = 0.05, l2: float = 1e-5) -> 'DistilledLeadModel':
+        """Train one head per label; records whose label is missing (None) are left out of that head"""
+        features = self.features(texts)
+        self.trained_on = len(texts)
+        for label, values in labels.items():
+            known = np.array([value is not None and value == value for value in values])
+            if not known.any():
+                continue
+            rows = np.flatnonzero(known)
+            head_features = features if known.all() else _select_rows(features, rows)
+            if label == SCORE_LABEL:
+                classes = None
+                targets = np.clip(np.asarray([values[i] for i in rows], dtype=np.float64) / 100.0, 0.0, 1.0)[:, None]
+            else:
+                classes = sorted({str(values[i]) for i in rows})
+                class_index = {name: i for i, name in enumerate(classes)}
+                targets = np.zeros((len(rows), len(classes)))
+                targets[np.arange(len(rows)), [class_index[str(values[i])] for i in rows]] = 1.0
+            weights, bias = self._fit_head(head_features, targets, classes is None, epochs, learning_rate, l2)
+            self.heads[label] = (classes, weights, bias)
+        return self
+
+    def _fit_head(self, features, targets: np.ndarray, is_score: bool, epochs: int,
+                  learning_rate: float, l2: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Minimize cross-entropy (softmax, or logistic on the score) with full-batch Adam"""
+        n, k = targets.shape
+        weights = np.zeros((self.n_features, k))
+        # Start from the label prior so rare classes are not predicted early on
+        prior = targets.mean(axis=0).clip(1e-6, 1 - 1e-6)
+        bias = np.log(prior / (1 - prior)) if is_score else np.log(prior)
+        moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+        beta1, beta2 = 0.9, 0.999
+        for step in range(1, epochs + 1):
+            logits = _sparse_dot(features, weights) + bias
+            errors = ((_sigmoid(logits) if is_score else _softmax(logits)) - targets) / n
+            gradients = (_sparse_gradient(features, errors, self.n_features) + l2 * weights, errors.sum(axis=0))
+            for i, (param, gradient) in enumerate(zip((weights, bias), gradients)):
+                first, second = moments[2 * i], moments[2 * i + 1]
+                first *= beta1
+                first += (1 - beta1) * gradient
+                second *= beta2
+                second += (1 - beta2) * gradient ** 2
+                param -= learning_rate * (first / (1 - beta1 ** step)) / (np.sqrt(second / (1 - beta2 ** step)) + 1e-8)
+        return weights.astype(np.float32), bias.astype(np.float32)
+
+    def incremental(self) -> 'IncrementalPrediction':
+        """A prediction for a text that will arrive piece by piece (see IncrementalPrediction)"""
+        return IncrementalPrediction(self)
+
+    def predict(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Predict every trained label for a batch: class names, and lead scores on 0-100"""
+        features = self.features(texts)
+        predictions = {}
+        for label, (classes, weights, bias) in self.heads.items():
+            logits = _sparse_dot(features, weights) + bias
+            if classes is None:
+                predictions[label] = np.round(_sigmoid(logits[:, 0]) * 100, 1)
+            else:
+                predictions[label] = np.asarray(classes, dtype=object)[logits.argmax(axis=1)]
+        return predictions
+
+    def predict_one(self, text: str) -> Dict[str, Any]:
+        """Predict every trained label for one text, as plain Python values"""
+        return {label: values[0].item() if hasattr(values[0], 'item') else values[0]
+                for label, values in self.predict([text]).items()}
+
+    def evaluate(self, texts: Sequence[str], labels: Dict[str, Sequence[Any]]) -> Dict[str, float]:
+        """Accuracy per category label and mean absolute error of the lead score"""
+        predictions = self.predict(texts)
+        metrics = {}
+        for label, values in labels.items():
+            if label not in predictions:
+                continue
+            pairs = [(predicted, actual) for predicted, actual in zip(predictions[label], values)
+                     if actual is not None and actual == actual]
+            if not pairs:
+                continue
+            if label == SCORE_LABEL:
+                metrics[f'{label}_mae'] = float(np.mean([abs(p - float(a)) for p, a in pairs]))
+            else:
+                metrics[f'{label}_accuracy'] = float(np.mean([p == str(a) for p, a in pairs]))
+        return metrics
+
+    def save(self, path: str):
+        """Write the model to a .npz file (no pickled objects)"""
+        arrays = {}
+        meta = {'n_features': self.n_features, 'ngram_range': self.ngram_range,
+                'trained_on': self.trained_on, 'heads': {}}
+        for label, (classes, weights, bias) in self.heads.items():
+            meta['heads'][label] = classes
+            arrays[f'{label}__weights'] = weights
+            arrays[f'{label}__bias'] = bias
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'DistilledLeadModel':
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            model = cls(meta['n_features'], meta['ngram_range'])
+            model.trained_on = meta['trained_on']
+            for label, classes in meta['heads'].items():
+                model.heads[label] = (classes, data[f'{label}__weights'], data[f'{label}__bias'])
+        return model
+
+class IncrementalPrediction:
+    """A DistilledLeadModel prediction kept current as a text grows.
+
+    add() hashes only the new words (with the n-1 words before them, for
+    n-grams spanning the join) and updates each head's logits and the
+    feature norm for the buckets whose counts changed. predict() then only
+    normalizes, so its cost does not depend on the text's length. Pieces
+    are joined as if by whitespace, so the result matches predict_one on
+    the whole text.
+    """
+
+    def __init__(self, model: DistilledLeadModel):
+        self.model = model
+        self._counts = {}
+        self._tail = []
+        self._norm_squared = 0.0
+        self._dots = {label: np.zeros(len(bias)) for label, (classes, weights, bias) in model.heads.items()}
+
+    def add(self, text: str):
+        words = _WORD_PATTERN.findall(text.lower())
+        if not words:
+            return
+        context = self._tail + words
+        buckets, counts = np.unique(
+            _hash_grams(context, self.model.n_features, self.model.ngram_range, len(self._tail)), return_counts=True
+        )
+        bucket_list = buckets.tolist()
+        previous = np.array([self._counts.get(bucket, 0) for bucket in bucket_list])
+        current = previous + counts
+        self._counts.update(zip(bucket_list, current.tolist()))
+        old, new = np.log1p(previous), np.log1p(current)
+        self._norm_squared += float(np.dot(new, new) - np.dot(old, old))
+        for label, (classes, weights, bias) in self.model.heads.items():
+            self._dots[label] += (new - old) @ weights[buckets]
+        keep = self.model.ngram_range[1] - 1
+        self._tail = context[-keep:] if keep else []
+
+    def predict(self) -> Dict[str, Any]:
+        """Every trained label for the text so far, like DistilledLeadModel.predict_one"""
+        scale = 1.0 / np.sqrt(self._norm_squared) if self._norm_squared > 0 else 0.0
+        predictions = {}
+        for label, (classes, weights, bias) in self.model.heads.items():
+            logits = self._dots[label] * scale + bias
+            if classes is None:
+                predictions[label] = float(np.round(_sigmoid(logits[0]) * 100, 1))
+            else:
+                predictions[label] = classes[int(logits.argmax())]
+        return predictions
+
+@lru_cache(maxsize=None)
+def get_distilled_model(path: str) -> DistilledLeadModel:
+    """Load a saved model once per process"""
+    return DistilledLeadModel.load(path)
+
+def extract_labels(record: Dict[str, Any]) -> Dict[str, Optional[Any]]:
+    """Pull the LLM labels from a training record.
+
+    Labels may sit at the top level (a flat CSV row or history record) or,
+    as in LLMService results, under 'analysis' (categories) and 'score'
+    ('overall_score' for the lead score). Missing or blank labels are None.
+    """
+    analysis = record.get('analysis') if isinstance(record.get('analysis'), dict) else {}
+    score = record.get('score') if isinstance(record.get('score'), dict) else {}
+    labels = {}
+    for label in CATEGORY_LABELS:
+        value = record.get(label, analysis.get(label))
+        labels[label] = value if value not in (None, '') else None
+    value = record.get(SCORE_LABEL, score.get('overall_score'))
+    try:
+        labels[SCORE_LABEL] = float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        labels[SCORE_LABEL] = None
+    return labels
+
+def label_columns(records: List[Dict[str, Any]]) -> Dict[str, List[Optional[Any]]]:
+    """Labels of many records as one list per label"""
+    extracted = [extract_labels(record) for record in records]
+    return {label: [labels[label] for labels in extracted] for label in CATEGORY_LABELS + (SCORE_LABEL,)}
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Columnar archive of the analysis history (optional, needs pyarrow)
+
+Copies saved analyses from the history database into Parquet files
+partitioned by conversation month, with the Low/Medium/High fields stored
+as dictionary-encoded (categorical) columns. The history view's timing
+chart for a picked date reads only that month's partition, priority
+filters use Parquet statistics, and only the three charted columns are
+read. Run the export periodically; each run
+appends the analyses saved since the last one:
+    python history_archive.py export
+    python history_archive.py --archive history_archive export
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Optional
+from config import HISTORY_ARCHIVE_PATH, HISTORY_DB_PATH
+from history_store import HISTORY_COLUMNS, AnalysisHistoryStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    pc = None
+    ds = None
+
+# Low/Medium/High style fields with a handful of distinct values; free-text LLM fields such as
+# timeline stay plain strings
+CATEGORICAL_COLUMNS = ('day_of_week', 'priority_level', 'engagement_level', 'buying_intent', 'urgency_level')
+PARTITION_COLUMN = 'conversation_month'
+_ARROW_TYPES = {'TEXT': 'string', 'REAL': 'float64', 'INTEGER': 'int64'}
+# Files starting with '_' are not read as data by pyarrow
+_STATE_FILE = '_archive_state.json'
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+def archive_schema():
+    """Arrow schema of archived records: the id, every history column, and the month partition"""
+    # int32 indices, so an LLM answering outside the usual values cannot overflow the dictionary
+    fields = [pa.field('id', pa.int64())]
+    for column, kind in HISTORY_COLUMNS.items():
+        if column in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, getattr(pa, _ARROW_TYPES[kind])()))
+    fields.append(pa.field(PARTITION_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+def conversation_month(conversation_date: Optional[str]) -> str:
+    """'2025-03' for '2025-03-14'; records without a date go to 'unknown'"""
+    return conversation_date[:7] if conversation_date and len(conversation_date) >= 7 else 'unknown'
+
+class HistoryArchive:
+    """Month-partitioned Parquet copy of the history database.
+
+    `last_id` is the newest history record already archived; anything
+    newer is still only in the database.
+    """
+
+    def __init__(self, root: str = HISTORY_ARCHIVE_PATH):
+        if pa is None:
+            raise ImportError("The history archive needs pyarrow (pip install pyarrow)")
+        self.root = root
+        self.schema = archive_schema()
+        self._partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def last_id(self) -> int:
+        try:
+            with open(os.path.join(self.root, _STATE_FILE), encoding='utf-8') as f:
+                return json.load(f)['last_id']
+        except FileNotFoundError:
+            return 0
+
+    def _set_last_id(self, last_id: int):
+        path = os.path.join(self.root, _STATE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'last_id': last_id}, f)
+        os.replace(path + '.tmp', path)
+
+    def export(self, store: AnalysisHistoryStore, batch_size: int = 100000) -> int:
+        """Append records saved since the last export; returns how many were archived"""
+        exported = 0
+        for batch in store.iter_batches(self.last_id, batch_size):
+            for record in batch:
+                record[PARTITION_COLUMN] = conversation_month(record['conversation_date'])
+            # Sorted by date, each row group's min/max statistics cover a narrow date range
+            batch.sort(key=lambda record: record['conversation_date'] or '')
+            table = pa.Table.from_pylist(batch, schema=self.schema)
+            first_id = min(record['id'] for record in batch)
+            last_id = max(record['id'] for record in batch)
+            ds.write_dataset(
+                table, self.root, format='parquet', partitioning=self._partitioning,
+                basename_template=f'part-{first_id}-{last_id}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            # Only advance once the batch is on disk; a rerun rewrites the same file names
+            self._set_last_id(last_id)
+            exported += len(batch)
+        return exported
+
+    def _dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=self._partitioning, schema=self.schema)
+
+    @staticmethod
+    def _condition(conversation_date: Optional[str] = None, priority_level: Optional[str] = None):
+        """Filter expression for the history filters; None matches everything"""
+        condition = None
+        if conversation_date:
+            # The month comparison prunes partitions before any file is opened
+            condition = (ds.field(PARTITION_COLUMN) == conversation_month(conversation_date)) & \
+                (ds.field('conversation_date') == conversation_date)
+        if priority_level:
+            priority = ds.field('priority_level') == priority_level
+            condition = priority if condition is None else condition & priority
+        return condition
+
+    def score_buckets(self, conversation_date: Optional[str] = None,
+                      priority_level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Like AnalysisHistoryStore.score_buckets, aggregated in Arrow from three columns"""
+        table = self._dataset().to_table(
+            columns=['conversation_time', 'priority_level', 'lead_score'],
+            filter=self._condition(conversation_date, priority_level)
+        )
+        hours = pc.utf8_slice_codeunits(table['conversation_time'], 0, 2)
+        grouped = pa.table({
+            'hour': pc.cast(pc.if_else(pc.utf8_is_digit(hours), hours, None), pa.int64()),
+            'priority_level': pc.cast(table['priority_level'], pa.string()),
+            'lead_score': table['lead_score']
+        }).group_by(['hour', 'priority_level']).aggregate([
+            ('lead_score', 'count', pc.CountOptions(mode='all')),
+            ('lead_score', 'sum')
+        ])
+        return [
+            {'hour': row['hour'], 'priority_level': row['priority_level'],
+             'count': row['lead_score_count'], 'score_sum': row['lead_score_sum'] or 0.0}
+            for row in grouped.to_pylist()
+        ]
+
+def main():
+    """Command-line export of the history database into the archive"""
+    parser = argparse.ArgumentParser(description="Archive saved analyses as month-partitioned Parquet")
+    parser.add_argument('--db', default=HISTORY_DB_PATH, help="History database file")
+    parser.add_argument('--archive', default=HISTORY_ARCHIVE_PATH or 'history_archive', help="Archive directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Archive analyses saved since the last export")
+    export.add_argument('--batch-size', type=int, default=100000)
+    args = parser.parse_args()
+
+    if not pyarrow_available():
+        raise SystemExit("❌ The history archive needs pyarrow (pip install pyarrow)")
+    archive = HistoryArchive(args.archive)
+    store = AnalysisHistoryStore(args.db)
+    exported = archive.export(store, args.batch_size)
+    print(f"✅ Archived {exported:,} analyses → {args.archive} (up to id {archive.last_id:,})")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Saved conversation analyses, stored in SQLite
+
+Each save is one INSERT into a WAL-mode database, so saving costs the same
+however long the history is, and sessions saving at the same time never
+overwrite each other's rows. Import the old CSV history once with:
+    python history_store.py migrate
+    python history_store.py --db history.sqlite3 migrate old_history.csv
+Headline metrics and the history chart's hour/priority buckets are kept in
+aggregate tables updated by every save; to
+recompute them (after editing the database by hand, say):
+    python history_store.py rebuild-aggregates
+Saves made from the app also keep the transcript and full analysis results
+(zlib-compressed, stored once per distinct content), so a past analysis can
+be shown again without calling the LLM, or exported as training data for
+train_distilled_model.py:
+    python history_store.py export-labelled labelled_calls.jsonl
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import HISTORY_DB_PATH, HISTORY_CSV_PATH
+
+# Column name -> SQLite type, in the order of the old CSV history, then the keys of the stored payload
+HISTORY_COLUMNS = {
+    'timestamp': 'TEXT',
+    'conversation_date': 'TEXT',
+    'conversation_time': 'TEXT',
+    'conversation_duration': 'TEXT',
+    'day_of_week': 'TEXT',
+    'lead_score': 'REAL',
+    'priority_level': 'TEXT',
+    'timeline': 'TEXT',
+    'confidence_level': 'TEXT',
+    'sentiment_score': 'REAL',
+    'engagement_level': 'TEXT',
+    'buying_intent': 'TEXT',
+    'urgency_level': 'TEXT',
+    'optimal_follow_up_time': 'TEXT',
+    'conversation_length': 'INTEGER',
+    'key_topics': 'TEXT',
+    'pain_points': 'TEXT',
+    'objections': 'TEXT',
+    'buying_signals': 'TEXT',
+    'next_steps': 'TEXT',
+    'transcript_hash': 'TEXT',
+    'results_hash': 'TEXT'
+}
+INDEXED_COLUMNS = ('conversation_date', 'priority_level', 'timestamp', 'lead_score')
+# Columns the history browser can sort by; each is indexed, so pages are read in index order
+SORTABLE_COLUMNS = ('timestamp', 'conversation_date', 'lead_score')
+
+# Running totals kept per save day (history_daily) and overall (history_totals), as SQL
+# aggregates over analysis_history; both tables are updated in the same transaction as each save
+LEVELS = ('High', 'Medium', 'Low')
+AGGREGATES = {
+    'analyses': "COUNT(*)",
+    'score_sum': "TOTAL(lead_score)",
+    'scored': "COUNT(lead_score)",
+    **{f"priority_{level.lower()}": f"COUNT(CASE WHEN priority_level = '{level}' THEN 1 END)" for level in LEVELS},
+    **{f"engagement_{level.lower()}": f"COUNT(CASE WHEN engagement_level = '{level}' THEN 1 END)" for level in LEVELS}
+}
+
+# Conversation hour of a record, as grouped by score_buckets and history_hourly
+_HOUR_SQL = "CAST(substr(conversation_time, 1, 2) AS INTEGER)"
+
+_CONVERTERS = {'REAL': float, 'INTEGER': lambda value: int(float(value)), 'TEXT': str}
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the uncompressed content; equal content always gets the same key"""
+    return hashlib.sha256(data).hexdigest()
+
+def _convert(column: str, value: Any) -> Any:
+    """Coerce a CSV/record value to the column's type; blanks and bad numbers become NULL"""
+    if value is None or value == '':
+        return None
+    try:
+        return _CONVERTERS[HISTORY_COLUMNS[column]](value)
+    except (TypeError, ValueError):
+        return None
+
+class AnalysisHistoryStore:
+    """Append-only history of saved analyses in a SQLite database.
+
+    The database runs in WAL mode, so readers never block the writer and a
+    save is a single-row insert and commit. Lookups by conversation date,
+    priority and save time use indexes. Headline metrics, unfiltered counts
+    and the hour/priority score buckets come from aggregate tables that each
+    save updates, so reading them does not scan the history;
+    rebuild_aggregates() recomputes them from scratch.
+
+    The transcript and full results of a save go into analysis_blobs,
+    zlib-compressed and keyed by the SHA-256 of their content, so saving
+    the same transcript or the same results again stores nothing new.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ',\n'.join(f"{name} {kind}" for name, kind in HISTORY_COLUMNS.items())
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS analysis_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {columns}
+            )
+        """)
+        # Databases created before a column was added get it here; older rows leave it NULL
+        existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(analysis_history)")}
+        for name, kind in HISTORY_COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE analysis_history ADD COLUMN {name} {kind}")
+        for column in INDEXED_COLUMNS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_analysis_history_{column} ON analysis_history ({column})")
+        # Bookkeeping such as which CSV files were already migrated
+        self._conn.execute("CREATE TABLE IF NOT EXISTS history_meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Content-addressed, compressed transcripts and results; size is the uncompressed byte count
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL)"
+        )
+        aggregates = ', '.join(f"{name} {'REAL' if name == 'score_sum' else 'INTEGER'} NOT NULL" for name in AGGREGATES)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS history_daily (day TEXT PRIMARY KEY, {aggregates})")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS history_totals (id INTEGER PRIMARY KEY CHECK (id = 1), {aggregates})")
+        # Score buckets per conversation hour and priority; a missing hour is stored as -1 and a
+        # missing priority as '', since NULLs never conflict in a primary key
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history_hourly (hour INTEGER NOT NULL, priority_level TEXT NOT NULL, "
+            "count INTEGER NOT NULL, score_sum REAL NOT NULL, PRIMARY KEY (hour, priority_level))"
+        )
+        self._conn.commit()
+        self._insert_sql = (
+            f"INSERT INTO analysis_history ({', '.join(HISTORY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+        )
+        totals = self._conn.execute("SELECT analyses FROM history_totals").fetchone()
+        if totals is None or (totals[0] and self._conn.execute("SELECT 1 FROM history_hourly LIMIT 1").fetchone() is None):
+            # A database from before the aggregate tables (or the hourly buckets) existed
+            self.rebuild_aggregates()
+
+    def _row(self, record: Dict[str, Any]) -> tuple:
+        return tuple(_convert(column, record.get(column)) for column in HISTORY_COLUMNS)
+
+    def add(self, record: Dict[str, Any], transcript: Optional[str] = None,
+            results: Optional[Dict[str, Any]] = None) -> int:
+        """Save one analysis record and update the aggregates; returns its id.
+
+        With a transcript and/or results (any JSON-serializable dict, e.g.
+        LLMService.run_analysis_pipeline output), those are stored too and
+        can be read back with payload().
+        """
+        record = dict(record)
+        with self._lock, self._conn:
+            if transcript is not None:
+                record['transcript_hash'] = self._put_blob(transcript.encode('utf-8'))
+            if results is not None:
+                # Sorted keys, so equal results serialize, hash and dedupe the same
+                encoded = json.dumps(results, sort_keys=True, separators=(',', ':'), default=str)
+                record['results_hash'] = self._put_blob(encoded.encode('utf-8'))
+            cursor = self._conn.execute(self._insert_sql, self._row(record))
+            self._accumulate(cursor.lastrowid, cursor.lastrowid)
+            return cursor.lastrowid
+
+    def _put_blob(self, data: bytes) -> str:
+        """Store content once under its hash (inside a transaction); returns the hash"""
+        key = content_hash(data)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO analysis_blobs (hash, data, size) VALUES (?, ?, ?)",
+            (key, zlib.compress(data), len(data))
+        )
+        return key
+
+    def payload(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """The saved record with its transcript ('conversation') and full 'results'.
+
+        Returns None for an unknown id. Records saved without a payload
+        (such as CSV imports) have None for the missing parts.
+        """
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT h.*, t.data AS transcript_data, r.data AS results_data
+                FROM analysis_history h
+                LEFT JOIN analysis_blobs t ON t.hash = h.transcript_hash
+                LEFT JOIN analysis_blobs r ON r.hash = h.results_hash
+                WHERE h.id = ?
+            """, (record_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        transcript_data = record.pop('transcript_data')
+        results_data = record.pop('results_data')
+        return {
+            'record': record,
+            'conversation': zlib.decompress(transcript_data).decode('utf-8') if transcript_data is not None else None,
+            'results': json.loads(zlib.decompress(results_data)) if results_data is not None else None
+        }
+
+    def blob_stats(self) -> Dict[str, int]:
+        """Distinct stored payloads, their total uncompressed and compressed bytes, and saves referencing them"""
+        with self._lock:
+            blobs, raw_bytes, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), IFNULL(SUM(size), 0), IFNULL(SUM(length(data)), 0) FROM analysis_blobs"
+            ).fetchone()
+            references = self._conn.execute(
+                "SELECT COUNT(transcript_hash) + COUNT(results_hash) FROM analysis_history"
+            ).fetchone()[0]
+        return {'blobs': blobs, 'raw_bytes': raw_bytes, 'stored_bytes': stored_bytes, 'references': references}
+
+    def _accumulate(self, first_id: int, last_id: int):
+        """Add the records with ids in [first_id, last_id] to the aggregate tables (inside a transaction)"""
+        names = ', '.join(AGGREGATES)
+        expressions = ', '.join(AGGREGATES.values())
+        updates = ', '.join(f"{name} = {name} + excluded.{name}" for name in AGGREGATES)
+        self._conn.execute(f"""
+            INSERT INTO history_daily (day, {names})
+            SELECT IFNULL(substr(timestamp, 1, 10), ''), {expressions}
+            FROM analysis_history WHERE id BETWEEN ? AND ? GROUP BY 1
+            ON CONFLICT (day) DO UPDATE SET {updates}
+        """, (first_id, last_id))
+        # Without GROUP BY this yields one row even for an empty range, so the totals row always exists
+        self._conn.execute(f"""
+            INSERT INTO history_totals (id, {names})
+            SELECT 1, {expressions}
+            FROM analysis_history WHERE id BETWEEN ? AND ?
+            ON CONFLICT (id) DO UPDATE SET {updates}
+        """, (first_id, last_id))
+        self._conn.execute(f"""
+            INSERT INTO history_hourly (hour, priority_level, count, score_sum)
+            SELECT IFNULL({_HOUR_SQL}, -1), IFNULL(priority_level, ''), COUNT(*), TOTAL(lead_score)
+            FROM analysis_history WHERE id BETWEEN ? AND ? GROUP BY 1, 2
+            ON CONFLICT (hour, priority_level) DO UPDATE SET
+                count = count + excluded.count, score_sum = score_sum + excluded.score_sum
+        """, (first_id, last_id))
+
+    def rebuild_aggregates(self):
+        """Recompute the aggregate tables from the full history"""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM history_daily")
+            self._conn.execute("DELETE FROM history_totals")
+            self._conn.execute("DELETE FROM history_hourly")
+            last_id = self._conn.execute("SELECT IFNULL(MAX(id), 0) FROM analysis_history").fetchone()[0]
+            self._accumulate(0, last_id)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT analyses FROM history_totals").fetchone()[0]
+
+    def summary(self, since_date: str) -> Dict[str, Any]:
+        """Headline metrics from the aggregate tables, without scanning the history.
+
+        Returns total analyses, average lead score, analyses saved on or after
+        since_date ('YYYY-MM-DD'), High priority count, and counts per
+        priority and engagement level.
+        """
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT * FROM history_totals").fetchone())
+            recent = self._conn.execute(
+                "SELECT IFNULL(SUM(analyses), 0) FROM history_daily WHERE day >= ?", (since_date[:10],)
+            ).fetchone()[0]
+        return {
+            'total': totals['analyses'],
+            'avg_score': totals['score_sum'] / totals['scored'] if totals['scored'] else 0.0,
+            'recent': recent,
+            'high_priority': totals['priority_high'],
+            'by_priority': {level: totals[f"priority_{level.lower()}"] for level in LEVELS},
+            'by_engagement': {level: totals[f"engagement_{level.lower()}"] for level in LEVELS}
+        }
+
+    @staticmethod
+    def _filters(conversation_date: Optional[str] = None, priority_level: Optional[str] = None,
+                 after_id: int = 0) -> Tuple[List[str], List[Any]]:
+        """SQL conditions and parameters for the history filters"""
+        conditions, params = [], []
+        if after_id:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if conversation_date:
+            conditions.append("conversation_date = ?")
+            params.append(conversation_date)
+        if priority_level:
+            conditions.append("priority_level = ?")
+            params.append(priority_level)
+        return conditions, params
+
+    def query(self, conversation_date: Optional[str] = None, priority_level: Optional[str] = None,
+              columns: Iterable[str] = HISTORY_COLUMNS, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Saved records matching the filters, oldest first; `after_id` skips records up to that id"""
+        columns = [column for column in columns if column in HISTORY_COLUMNS]
+        conditions, params = self._filters(conversation_date, priority_level, after_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM analysis_history {where} ORDER BY id", params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_matching(self, conversation_date: Optional[str] = None, priority_level: Optional[str] = None,
+                       after_id: int = 0, limit: Optional[int] = None) -> int:
+        """Number of saved records matching the filters, counting no further than `limit`.
+
+        Without a date filter the count comes from the aggregate tables;
+        otherwise at most `limit` matching rows are read.
+        """
+        if not conversation_date and not after_id and (not priority_level or priority_level in LEVELS):
+            column = f"priority_{priority_level.lower()}" if priority_level else 'analyses'
+            with self._lock:
+                total = self._conn.execute(f"SELECT {column} FROM history_totals").fetchone()[0]
+            return total if limit is None else min(total, limit)
+        conditions, params = self._filters(conversation_date, priority_level, after_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f"SELECT 1 FROM analysis_history {where}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+    def page(self, conversation_date: Optional[str] = None, priority_level: Optional[str] = None,
+             sort_by: str = 'timestamp', descending: bool = True, page_size: int = 50,
+             cursor: Optional[Tuple[Any, int]] = None,
+             columns: Iterable[str] = HISTORY_COLUMNS) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """One page of matching records, sorted server-side, with keyset pagination.
+
+        Records are ordered by (sort_by, id). `cursor` is the (sort value, id)
+        of the last record on the previous page, and the page starts right
+        after it, so reading any page costs the same however deep it is.
+        Returns the page and the cursor for the next one (None on the last
+        page). NULL sort values come first ascending and last descending.
+        """
+        if sort_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort history by {sort_by!r}; expected one of {', '.join(SORTABLE_COLUMNS)}")
+        columns = [column for column in columns if column in HISTORY_COLUMNS and column != sort_by]
+        conditions, params = self._filters(conversation_date, priority_level)
+        if cursor is not None:
+            value, last_id = cursor
+            after = '<' if descending else '>'
+            if value is None:
+                # Still in the NULL group: descending it is last, ascending every non-NULL value follows it
+                rest = '' if descending else f" OR {sort_by} IS NOT NULL"
+                conditions.append(f"(({sort_by} IS NULL AND id {after} ?){rest})")
+                params.append(last_id)
+            else:
+                rest = f" OR {sort_by} IS NULL" if descending else ''
+                conditions.append(f"({sort_by} {after} ? OR ({sort_by} = ? AND id {after} ?){rest})")
+                params.extend([value, value, last_id])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        direction = 'DESC' if descending else 'ASC'
+        sql = (
+            f"SELECT id, {', '.join([sort_by] + columns)} FROM analysis_history {where} "
+            f"ORDER BY {sort_by} {direction}, id {direction} LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size + 1]).fetchall()
+        records = [dict(row) for row in rows[:page_size]]
+        next_cursor = (records[-1][sort_by], records[-1]['id']) if len(rows) > page_size else None
+        return records, next_cursor
+
+    def score_buckets(self, conversation_date: Optional[str] = None, priority_level: Optional[str] = None,
+                      after_id: int = 0) -> List[Dict[str, Any]]:
+        """Matching records grouped by conversation hour and priority: count and lead score sum per bucket.
+
+        Without a date filter the buckets are read from history_hourly
+        rather than the history.
+        """
+        if not conversation_date and not after_id:
+            where, params = ("WHERE priority_level = ?", [priority_level]) if priority_level else ('', [])
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT NULLIF(hour, -1) AS hour, NULLIF(priority_level, '') AS priority_level, count, score_sum "
+                    f"FROM history_hourly {where}", params
+                ).fetchall()
+            return [dict(row) for row in rows]
+        conditions, params = self._filters(conversation_date, priority_level, after_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_HOUR_SQL} AS hour, priority_level, "
+                f"COUNT(*) AS count, TOTAL(lead_score) AS score_sum "
+                f"FROM analysis_history {where} GROUP BY hour, priority_level",
+                params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_batches(self, after_id: int = 0, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield every record after an id, with its id, in batches of at most batch_size"""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM analysis_history WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+            after_id = rows[-1]['id']
+
+    def migrate_csv(self, csv_path: str = HISTORY_CSV_PATH, batch_size: int = 1000) -> int:
+        """Stream a CSV history into the store in batches; returns the number of rows imported.
+
+        The number of rows taken from each file is remembered, so running the
+        migration again only imports rows appended to the CSV since. Columns
+        missing from the CSV are stored as NULL.
+        """
+        key = f"migrated_rows:{os.path.abspath(csv_path)}"
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM history_meta WHERE key = ?", (key,)).fetchone()
+        skip = int(done[0]) if done else 0
+
+        imported = 0
+        with open(csv_path, encoding='utf-8', newline='') as f, self._lock:
+            # One transaction for the whole file: all rows or none
+            with self._conn:
+                # Take the write lock up front so the imported rows get consecutive ids
+                self._conn.execute("BEGIN IMMEDIATE")
+                first_id = self._conn.execute("SELECT IFNULL(MAX(id), 0) FROM analysis_history").fetchone()[0] + 1
+                batch = []
+                for record in islice(csv.DictReader(f), skip, None):
+                    batch.append(self._row(record))
+                    if len(batch) >= batch_size:
+                        self._conn.executemany(self._insert_sql, batch)
+                        imported += len(batch)
+                        batch = []
+                if batch:
+                    self._conn.executemany(self._insert_sql, batch)
+                    imported += len(batch)
+                if imported:
+                    self._accumulate(first_id, first_id + imported - 1)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO history_meta (key, value) VALUES (?, ?)", (key, str(skip + imported))
+                )
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def merge_buckets(*bucket_lists: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add up score buckets from several sources, adding each bucket's average lead score"""
+    merged = {}
+    for buckets in bucket_lists:
+        for bucket in buckets:
+            key = (bucket['hour'], bucket['priority_level'])
+            total = merged.setdefault(key, {'hour': key[0], 'priority_level': key[1], 'count': 0, 'score_sum': 0.0})
+            total['count'] += bucket['count']
+            total['score_sum'] += bucket['score_sum']
+    for bucket in merged.values():
+        bucket['avg_score'] = bucket['score_sum'] / bucket['count']
+    return sorted(merged.values(), key=lambda bucket: (bucket['hour'] is None, bucket['hour'] or 0, bucket['priority_level'] or ''))
+
+def main():
+    """Command-line maintenance for the history database"""
+    parser = argparse.ArgumentParser(description="Manage the saved analysis history")
+    parser.add_argument('--db', default=HISTORY_DB_PATH, help="History database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('migrate', help="Import a CSV history file")
+    migrate.add_argument('csv', nargs='?', default=HISTORY_CSV_PATH)
+    migrate.add_argument('--batch-size', type=int, default=1000)
+    commands.add_parser('rebuild-aggregates', help="Recompute the headline metric tables from the full history")
+    show = commands.add_parser('show', help="Print a saved analysis with its transcript and results as JSON")
+    show.add_argument('id', type=int)
+    export = commands.add_parser('export-labelled', help="Write saved transcripts with their AI results as JSONL, "
+                                                         "e.g. to train a distilled model")
+    export.add_argument('output')
+    args = parser.parse_args()
+
+    store = AnalysisHistoryStore(args.db)
+    if args.command == 'migrate':
+        if not os.path.exists(args.csv):
+            raise SystemExit(f"❌ No CSV history at {args.csv}")
+        imported = store.migrate_csv(args.csv, args.batch_size)
+        if imported:
+            print(f"✅ Imported {imported:,} analyses from {args.csv} → {args.db}")
+        else:
+            print(f"ℹ️  Nothing new to import from {args.csv}")
+    elif args.command == 'rebuild-aggregates':
+        store.rebuild_aggregates()
+        print(f"✅ Rebuilt history aggregates in {args.db}")
+    elif args.command == 'show':
+        payload = store.payload(args.id)
+        if payload is None:
+            raise SystemExit(f"❌ No analysis with id {args.id} in {args.db}")
+        print(json.dumps(payload, indent=2, ensure_ascii=False))
+        store.close()
+        return
+    elif args.command == 'export-labelled':
+        # One line per distinct transcript, with the results of its latest save
+        latest = {}
+        for batch in store.iter_batches():
+            for record in batch:
+                if record['transcript_hash'] and record['results_hash']:
+                    latest[record['transcript_hash']] = record['id']
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for record_id in latest.values():
+                payload = store.payload(record_id)
+                results = payload['results']['results']
+                f.write(json.dumps({'id': record_id, 'conversation': payload['conversation'],
+                                    'analysis': results['analysis'], 'score': results['score']}, ensure_ascii=False) + '\n')
+        print(f"✅ Wrote {len(latest):,} labelled transcripts → {args.output}")
+    print(f"📊 {store.count():,} analyses in history")
+    stats = store.blob_stats()
+    if stats['blobs']:
+        print(f"🗜️  {stats['references']:,} stored transcripts/results in {stats['blobs']:,} distinct payloads, "
+              f"{stats['raw_bytes']:,} → {stats['stored_bytes']:,} bytes compressed")
+    store.close()
+
+if __name__ == "__main__":
+    main()
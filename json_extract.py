@@ -0,0 +1,101 @@
+import json
+from typing import Any, Dict, Iterable, Optional
+
+def matches_schema(value: Any, schema: Dict[str, Any]) -> bool:
+    """Check a parsed value against a minimal schema.
+
+    A schema gives the expected `type` (dict or list), optionally the keys a
+    dict must contain (`required`) or the type every list item must have (`items`).
+    """
+    if not isinstance(value, schema['type']):
+        return False
+    if isinstance(value, dict):
+        return all(key in value for key in schema.get('required', ()))
+    item_type = schema.get('items')
+    if item_type is not None:
+        return all(isinstance(item, item_type) for item in value)
+    return True
+
+class JSONExtractor:
+    """Find the first complete JSON object or array in text that matches a schema.
+
+    Text can be fed in one piece or chunk by chunk (e.g. from a token stream);
+    every character is scanned once. Bracket depth is tracked outside of
+    strings, and each balanced candidate is parsed and validated as soon as
+    it closes, so a stream can be stopped the moment `feed` returns a result.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.opener = '{' if schema['type'] is dict else '['
+        self.result = None
+        self.done = False
+        # Total characters consumed up to the end of the result
+        self.consumed = 0
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        """Scan the next chunk of text; return the result once one is found"""
+        if self.done:
+            return self.result
+
+        segment_start = None if self._depth == 0 else 0
+        for i, char in enumerate(chunk):
+            if self._depth == 0:
+                if char == self.opener:
+                    self._depth = 1
+                    segment_start = i
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[segment_start:i + 1])
+                    segment_start = None
+                    candidate = ''.join(self._parts)
+                    self._parts = []
+                    if self._accept(candidate):
+                        self.consumed += i + 1
+                        return self.result
+
+        if segment_start is not None:
+            self._parts.append(chunk[segment_start:])
+        self.consumed += len(chunk)
+        return None
+
+    def _accept(self, candidate: str) -> bool:
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            return False
+        if not matches_schema(value, self.schema):
+            return False
+        self.result = value
+        self.done = True
+        return True
+
+def extract_json(text: str, schema: Dict[str, Any]) -> Optional[Any]:
+    """Return the first JSON value in text that matches schema, or None"""
+    return JSONExtractor(schema).feed(text)
+
+def extract_json_from_stream(chunks: Iterable[str], schema: Dict[str, Any]) -> Optional[Any]:
+    """Consume chunks only until a matching JSON value is complete"""
+    extractor = JSONExtractor(schema)
+    for chunk in chunks:
+        if extractor.feed(chunk) is not None:
+            break
+    return extractor.result
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, List, Tuple
+
+class KeywordMatcher:
+    """Match a whole keyword lexicon against text in a single pass.
+
+    The lexicon ({category: [phrases]}) is compiled into one regular
+    expression shaped like a trie of the phrases, so the text is scanned once
+    and each position is tried against all phrases together. Matches are
+    case-insensitive, must start and end on word boundaries ("issue" does
+    not match inside "tissue"), and spaces inside a phrase match any run of
+    whitespace, including line breaks. When phrases overlap, the longest wins.
+    """
+
+    def __init__(self, lexicon: Dict[str, List[str]]):
+        self.categories = list(lexicon)
+        self._category_of = {}
+        for category, phrases in lexicon.items():
+            for phrase in phrases:
+                # A phrase listed under two categories counts for the first one
+                self._category_of.setdefault(self._normalize(phrase), category)
+
+        trie = {}
+        for phrase in self._category_of:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        # The pattern starts with the trie itself so the regex engine can skip
+        # ahead on its first-character set; the left word boundary is checked
+        # in scan() instead of with a lookbehind, which would disable that.
+        body = self._trie_to_regex(trie) + r'(?!\w)'
+        self.pattern = re.compile(body)
+        # For text whose lowercase form changes length (rare non-ASCII letters)
+        self._pattern_ignorecase = re.compile(body, re.IGNORECASE)
+
+    @staticmethod
+    def _normalize(phrase: str) -> str:
+        return ' '.join(phrase.lower().split())
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
+
+    @classmethod
+    def _trie_to_regex(cls, node: Dict[str, dict]) -> str:
+        """Turn a character trie into an equivalent regex, longest branches first"""
+        terminal = '' in node
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + cls._trie_to_regex(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # Greedy optional group: try the longer phrase, fall back to the shorter one
+            return '(?:' + body + ')?'
+        return body
+
+    def scan(self, text: str) -> Tuple[Dict[str, int], Dict[str, List[Tuple[int, int]]]]:
+        """Return per-category match counts and (start, end) positions"""
+        positions = {category: [] for category in self.categories}
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            # Matching lowercased text case-sensitively is much faster than re.IGNORECASE
+            search, haystack = self.pattern.search, lowered
+        else:
+            search, haystack = self._pattern_ignorecase.search, text
+
+        pos = 0
+        while True:
+            match = search(haystack, pos)
+            if match is None:
+                break
+            start, end = match.span()
+            if start and self._is_word_char(haystack[start - 1]):
+                # Inside a longer word ("issue" in "tissue"); a real match may start further on
+                pos = start + 1
+                continue
+            category = self._category_of[self._normalize(match.group())]
+            positions[category].append((start, end))
+            pos = end
+        counts = {category: len(spans) for category, spans in positions.items()}
+        return counts, positions
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return per-category match counts"""
+        return self.scan(text)[0]
+
+# A lexicon file compiled into a matcher; `mtime_ns` identifies the file version it was built from
+CompiledLexicon = namedtuple('CompiledLexicon', ['version', 'keywords', 'matcher', 'mtime_ns'])
+
+class LexiconError(ValueError):
+    """A keyword lexicon file that cannot be used"""
+
+# Process-wide cache of compiled lexicons by absolute path, plus file versions that failed to load
+_lexicons = {}
+_failed_mtimes = {}
+_lexicons_lock = threading.Lock()
+
+def load_lexicon(path: str, required_categories: Iterable[str] = ()) -> CompiledLexicon:
+    """Read and compile a lexicon file: {"version": ..., "categories": {category: [phrases]}}"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    
+    categories = data.get('categories') if isinstance(data, dict) else None
+    if not isinstance(categories, dict) or not all(
+        isinstance(phrases, list) and all(isinstance(phrase, str) for phrase in phrases)
+        for phrases in categories.values()
+    ):
+        raise LexiconError(f"{path}: expected {{\"version\": ..., \"categories\": {{category: [phrases]}}}}")
+    missing = [category for category in required_categories if category not in categories]
+    if missing:
+        raise LexiconError(f"{path}: missing categories {', '.join(missing)}")
+    return CompiledLexicon(data.get('version'), categories, KeywordMatcher(categories), mtime_ns)
+
+def get_lexicon(path: str, required_categories: Iterable[str] = ()) -> CompiledLexicon:
+    """Return the compiled lexicon for a file, recompiling it when the file changes.
+    
+    Each call only stats the file. When its mtime differs from the cached
+    copy, the new version is compiled and swapped in as a whole, so callers
+    see either the old lexicon or the new one, never a mix. If the changed
+    file cannot be loaded, the previous version stays in use.
+    """
+    path = os.path.abspath(path)
+    cached = _lexicons.get(path)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        if cached is not None:
+            return cached
+        raise
+    if cached is not None and (cached.mtime_ns == mtime_ns or _failed_mtimes.get(path) == mtime_ns):
+        return cached
+    
+    with _lexicons_lock:
+        cached = _lexicons.get(path)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+        try:
+            lexicon = load_lexicon(path, required_categories)
+        except (OSError, ValueError):
+            if cached is None:
+                raise
+            # Half-written or invalid edit: keep serving the last good version until the file changes again
+            _failed_mtimes[path] = mtime_ns
+            return cached
+        _lexicons[path] = lexicon
+        return lexicon
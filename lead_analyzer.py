@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Optional, Union
+from config import SENTIMENT_ENGINE, KEYWORD_LEXICON_PATH, LEAD_SCORING_MODEL
+from keyword_matcher import CompiledLexicon, get_lexicon
+from sentiment import SentimentTotals, add_totals, get_sentiment_analyzer, sentiment_from_totals
+from transcript import exclude_rep, parse_transcript
+
+# Lead score = base + sentiment polarity * weight + keyword counts * per-category weights, clipped to 0-100
+BASE_LEAD_SCORE = 50
+SENTIMENT_WEIGHT = 20
+KEYWORD_WEIGHTS = {
+    'interest': 5,
+    'buying_signals': 10,
+    'decision_maker': 8,
+    'objection': -3
+}
+
+# Engagement level by word count: above 100 words is High, above 50 is Medium
+ENGAGEMENT_THRESHOLDS = (('High', 100), ('Medium', 50))
+ENGAGEMENT_LEVELS = ['Low', 'Medium', 'High']
+
+# Keyword categories the score and insights rely on; a lexicon file must define them all
+REQUIRED_CATEGORIES = ('interest', 'objection', 'buying_signals', 'pain_points', 'decision_maker')
+
+class LeadAnalyzer:
+    """Keyword and sentiment lead analysis.
+    
+    With a scoring model (a DistilledLeadModel trained on LLM labels), the
+    lead score and engagement level come from the model instead of the
+    keyword formula, and results also carry its buying_intent and
+    urgency_level. Sentiment, keywords and insights are unchanged.
+    """
+    
+    def __init__(self, sentiment_engine: Optional[str] = None, prospect_only: bool = False,
+                 lexicon_path: str = KEYWORD_LEXICON_PATH, scoring_model: Optional[str] = LEAD_SCORING_MODEL):
+        # The compiled lexicon and sentiment engine are shared process-wide, so this is cheap
+        self.lexicon_path = lexicon_path
+        # Load now so a missing or invalid lexicon file fails here rather than mid-analysis
+        get_lexicon(lexicon_path, REQUIRED_CATEGORIES)
+        # 'textblob' or 'lexicon'; both return a Sentiment(polarity, subjectivity)
+        self.sentiment_analyzer = get_sentiment_analyzer(sentiment_engine or SENTIMENT_ENGINE)
+        # Leave the sales rep's own turns out of sentiment, keywords and word count
+        self.prospect_only = prospect_only
+        self.model = None
+        if scoring_model:
+            from distilled_model import get_distilled_model
+            self.model = get_distilled_model(scoring_model)
+    
+    @property
+    def lexicon(self) -> CompiledLexicon:
+        """The current keyword lexicon; a changed file is recompiled and swapped in"""
+        return get_lexicon(self.lexicon_path, REQUIRED_CATEGORIES)
+    
+    @property
+    def keywords(self) -> Dict[str, list]:
+        return self.lexicon.keywords
+    
+    @property
+    def matcher(self):
+        return self.lexicon.matcher
+    
+    def analyze_conversation(self, text):
+        lexicon = self.lexicon
+        sentiment, keyword_counts, keyword_positions, word_count = self._measure(text, lexicon)
+        
+        # Calculate lead score
+        score = self.calculate_lead_score(keyword_counts, sentiment)
+        
+        # Generate insights
+        insights = self.generate_insights(keyword_counts, sentiment, text)
+        
+        result = {
+            'sentiment': sentiment,
+            'keyword_counts': keyword_counts,
+            'keyword_positions': keyword_positions,
+            'lead_score': score,
+            'insights': insights,
+            'word_count': word_count,
+            'engagement_level': self.engagement_from_word_counts(word_count),
+            'lexicon_version': lexicon.version
+        }
+        if self.model is not None:
+            result.update(self.model.predict_one(self.scored_text(text)))
+        return result
+    
+    def scored_text(self, text: str) -> str:
+        """The part of a conversation that is scored: all of it, or the non-rep turns when prospect_only"""
+        if not self.prospect_only:
+            return text
+        return '\n'.join(turn.text for turn in exclude_rep(parse_transcript(text)))
+    
+    def _measure(self, text, lexicon: CompiledLexicon):
+        """Sentiment, keyword counts and positions, and word count of the scored part of a conversation"""
+        if not self.prospect_only:
+            # Count keywords in one pass over the text
+            keyword_counts, keyword_positions = lexicon.matcher.scan(text)
+            return self.sentiment_analyzer.sentiment(text), keyword_counts, keyword_positions, len(text.split())
+        
+        # Turn texts are slices of the transcript, so positions shift by each turn's start
+        totals = SentimentTotals(0.0, 0.0, 0)
+        keyword_counts = dict.fromkeys(lexicon.keywords, 0)
+        keyword_positions = {category: [] for category in lexicon.keywords}
+        word_count = 0
+        for turn in exclude_rep(parse_transcript(text)):
+            counts, positions = lexicon.matcher.scan(turn.text)
+            for category, count in counts.items():
+                keyword_counts[category] += count
+                keyword_positions[category].extend((start + turn.start, end + turn.start) for start, end in positions[category])
+            totals = add_totals(totals, self.sentiment_analyzer.assess(turn.text))
+            word_count += len(turn.text.split())
+        return sentiment_from_totals(totals), keyword_counts, keyword_positions, word_count
+    
+    def calculate_lead_score(self, keywords, sentiment):
+        """Score one conversation, or a whole batch when the counts and polarity are arrays"""
+        score = BASE_LEAD_SCORE + np.asarray(sentiment.polarity, dtype=float) * SENTIMENT_WEIGHT
+        for category, weight in KEYWORD_WEIGHTS.items():
+            score = score + np.asarray(keywords[category]) * weight
+        
+        score = np.clip(score, 0, 100)
+        return float(score) if score.ndim == 0 else score
+    
+    def calculate_engagement(self, text):
+        return self.engagement_from_word_counts(len(text.split()))
+    
+    @staticmethod
+    def engagement_from_word_counts(word_counts):
+        """Map one word count, or an array of them, to engagement levels"""
+        word_counts = np.asarray(word_counts)
+        levels = np.select(
+            [word_counts > threshold for _, threshold in ENGAGEMENT_THRESHOLDS],
+            [level for level, _ in ENGAGEMENT_THRESHOLDS],
+            default='Low'
+        )
+        return str(levels) if levels.ndim == 0 else levels
+    
+    def analyze_many(self, texts: Union[Iterable[str], pd.Series]) -> pd.DataFrame:
+        """Analyze a batch of conversations into a DataFrame with one row per text.
+        
+        Sentiment and keyword counts are gathered per text; the lead score and
+        engagement level are then computed for the whole batch as array
+        operations. A Series keeps its index; missing texts count as empty.
+        """
+        index = texts.index if isinstance(texts, pd.Series) else None
+        texts = ['' if pd.isna(text) else str(text) for text in texts]
+        size = len(texts)
+        
+        polarity = np.empty(size, dtype=np.float64)
+        subjectivity = np.empty(size, dtype=np.float64)
+        word_counts = np.empty(size, dtype=np.int64)
+        lexicon = self.lexicon
+        keyword_counts = {category: np.empty(size, dtype=np.int64) for category in lexicon.keywords}
+        
+        for i, text in enumerate(texts):
+            sentiment, counts, _, word_counts[i] = self._measure(text, lexicon)
+            polarity[i], subjectivity[i] = sentiment
+            for category, count in counts.items():
+                keyword_counts[category][i] = count
+        
+        frame = pd.DataFrame({'polarity': polarity, 'subjectivity': subjectivity, **keyword_counts}, index=index)
+        frame['lead_score'] = self.calculate_lead_score(keyword_counts, frame)
+        frame['word_count'] = word_counts
+        frame['engagement_level'] = pd.Categorical(
+            self.engagement_from_word_counts(word_counts), categories=ENGAGEMENT_LEVELS, ordered=True
+        )
+        if self.model is not None:
+            for label, values in self.model.predict([self.scored_text(text) for text in texts]).items():
+                classes = self.model.heads[label][0]
+                if classes is not None and set(classes) <= set(ENGAGEMENT_LEVELS):
+                    values = pd.Categorical(values, categories=ENGAGEMENT_LEVELS, ordered=True)
+                frame[label] = values
+        return frame
+    
+    def generate_insights(self, keywords, sentiment, text):
+        insights = []
+        
+        if sentiment.polarity > 0.3:
+            insights.append("🟢 Positive sentiment detected - prospect is engaged")
+        elif sentiment.polarity < -0.1:
+            insights.append("🔴 Negative sentiment - address concerns immediately")
+        
+        if keywords['buying_signals'] > 0:
+            insights.append("💰 Buying signals detected - move to proposal stage")
+        
+        if keywords['objection'] > keywords['interest']:
+            insights.append("⚠️ High objection level - focus on value proposition")
+        
+        if keywords['decision_maker'] > 0:
+            insights.append("👑 Decision maker identified - prioritize this lead")
+        
+        if keywords['pain_points'] > 0:
+            insights.append("🎯 Pain points mentioned - align solution benefits")
+        
+        return insights
+
+class LiveCallAnalyzer:
+    """Keep a LeadAnalyzer result up to date as a call transcript grows.
+    
+    Each append() scans only the new utterance: keyword counts and positions,
+    sentiment assessment totals, the word count and (with a scoring model)
+    its hashed n-gram features are accumulated, and the score, engagement
+    level and insights are recomputed from those totals in constant time. The result has the same shape as analyze_conversation on
+    the utterances joined by newlines (a keyword phrase split across two
+    utterances is not matched). Positions are offsets into that transcript.
+    With a prospect_only analyzer, utterances labelled as the sales rep's
+    ("Sales Rep: ...") are kept in the transcript but not scored.
+    """
+    
+    def __init__(self, analyzer: Optional[LeadAnalyzer] = None):
+        self.analyzer = analyzer or LeadAnalyzer()
+        self.utterances = []
+        # One lexicon version for the whole call, even if the file changes mid-call
+        self.lexicon = self.analyzer.lexicon
+        self.keyword_counts = dict.fromkeys(self.lexicon.keywords, 0)
+        self.keyword_positions = {category: [] for category in self.lexicon.keywords}
+        self.word_count = 0
+        self._length = 0
+        self._sentiment_totals = SentimentTotals(0.0, 0.0, 0)
+        # The scoring model's features are accumulated per utterance too
+        self._prediction = self.analyzer.model.incremental() if self.analyzer.model is not None else None
+    
+    def append(self, utterance: str) -> Dict[str, Any]:
+        """Add the next utterance and return the updated analysis"""
+        offset = self._length + 1 if self.utterances else 0
+        self.utterances.append(utterance)
+        self._length = offset + len(utterance)
+        
+        pieces = [(utterance, 0)]
+        if self.analyzer.prospect_only:
+            pieces = [(turn.text, turn.start) for turn in exclude_rep(parse_transcript(utterance))]
+        
+        for text, start in pieces:
+            counts, positions = self.lexicon.matcher.scan(text)
+            shift = offset + start
+            for category, count in counts.items():
+                self.keyword_counts[category] += count
+                self.keyword_positions[category].extend((begin + shift, end + shift) for begin, end in positions[category])
+            self._sentiment_totals = add_totals(self._sentiment_totals, self.analyzer.sentiment_analyzer.assess(text))
+            self.word_count += len(text.split())
+            if self._prediction is not None:
+                self._prediction.add(text)
+        return self.result()
+    
+    @property
+    def transcript(self) -> str:
+        return '\n'.join(self.utterances)
+    
+    def result(self) -> Dict[str, Any]:
+        """The analysis of everything appended so far, shaped like analyze_conversation's"""
+        sentiment = sentiment_from_totals(self._sentiment_totals)
+        keyword_counts = dict(self.keyword_counts)
+        result = {
+            'sentiment': sentiment,
+            'keyword_counts': keyword_counts,
+            'keyword_positions': self.keyword_positions,
+            'lead_score': self.analyzer.calculate_lead_score(keyword_counts, sentiment),
+            'insights': self.analyzer.generate_insights(keyword_counts, sentiment, None),
+            'word_count': self.word_count,
+            'engagement_level': self.analyzer.engagement_from_word_counts(self.word_count),
+            'lexicon_version': self.lexicon.version
+        }
+        if self._prediction is not None:
+            result.update(self._prediction.predict())
+        return result
@@ -1,23 +1,67 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from contextlib import closing
 import re
-from textblob import TextBlob
 import json
 from llm_service import LLMService
-from config import TOGETHER_API_KEY
+from llm_cache import LLMResponseCache
+from config import LLM_CACHE_ENABLED, APP_PAGES, HISTORY_CSV_PATH, HISTORY_ARCHIVE_PATH, HISTORY_COUNT_LIMIT, CASCADE_UNCERTAINTY_BAND
 from demo_data import get_demo_conversation, get_all_demo_conversations, get_quick_test_conversation
 
+# Response cache shared by every session
+@st.cache_resource
+def get_llm_cache():
+    if LLM_CACHE_ENABLED:
+        return LLMResponseCache()
+    return None
+
 # Initialize LLM Service
 @st.cache_resource
-def get_llm_service():
-    if TOGETHER_API_KEY:
-        return LLMService()
+def load_llm_service():
+    service = LLMService(cache=get_llm_cache())
+    if service.api_key_available:
+        return service
     return None
 
+# Pages that use the LLM go through here, so the sidebar only shows metrics
+# (and only builds the backend) once this session has needed the service
+def get_llm_service():
+    st.session_state['llm_service_loaded'] = True
+    return load_llm_service()
+
+# Saved analysis history shared by every session; an old CSV history is imported once
+@st.cache_resource
+def get_history_store():
+    import os
+    from history_store import AnalysisHistoryStore
+    store = AnalysisHistoryStore()
+    if os.path.exists(HISTORY_CSV_PATH):
+        try:
+            imported = store.migrate_csv(HISTORY_CSV_PATH)
+            if imported:
+                st.info(f"📥 Imported {imported} analyses from {HISTORY_CSV_PATH}")
+        except Exception as e:
+            st.warning(f"Could not import {HISTORY_CSV_PATH}: {str(e)}")
+    return store
+
+# Optional Parquet archive of the history; None when not configured or pyarrow is missing
+@st.cache_resource
+def get_history_archive():
+    if not HISTORY_ARCHIVE_PATH:
+        return None
+    from history_archive import HistoryArchive, pyarrow_available
+    if not pyarrow_available():
+        st.warning("HISTORY_ARCHIVE_PATH is set but pyarrow is not installed; reading history from the database")
+        return None
+    return HistoryArchive(HISTORY_ARCHIVE_PATH)
+
+# Keyword/sentiment analyzer for the basic (non-LLM) path; pandas, numpy and
+# the sentiment engine load only when a page first needs it
+@st.cache_resource
+def get_analyzer():
+    from lead_analyzer import LeadAnalyzer
+    return LeadAnalyzer()
+
 # Configure page
 st.set_page_config(
     page_title="LLM Lead Generation Coaching Tool",
@@ -126,88 +170,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class LeadAnalyzer:
-    def __init__(self):
-        self.keywords = {
-            'interest': ['interested', 'want to know', 'tell me more', 'sounds good', 'impressive'],
-            'objection': ['expensive', 'not sure', 'need to think', 'budget', 'competitor'],
-            'buying_signals': ['when can we start', 'pricing', 'contract', 'next steps', 'timeline'],
-            'pain_points': ['problem', 'challenge', 'struggling', 'difficult', 'issue'],
-            'decision_maker': ['I decide', 'my decision', 'I choose', 'I approve', 'final say']
-        }
-    
-    def analyze_conversation(self, text):
-        sentiment = TextBlob(text).sentiment
-        
-        # Count keywords
-        keyword_counts = {}
-        for category, words in self.keywords.items():
-            count = sum(text.lower().count(word.lower()) for word in words)
-            keyword_counts[category] = count
-        
-        # Calculate lead score
-        score = self.calculate_lead_score(keyword_counts, sentiment)
-        
-        # Generate insights
-        insights = self.generate_insights(keyword_counts, sentiment, text)
-        
-        return {
-            'sentiment': sentiment,
-            'keyword_counts': keyword_counts,
-            'lead_score': score,
-            'insights': insights,
-            'word_count': len(text.split()),
-            'engagement_level': self.calculate_engagement(text)
-        }
-    
-    def calculate_lead_score(self, keywords, sentiment):
-        base_score = 50
-        
-        # Sentiment impact
-        base_score += sentiment.polarity * 20
-        
-        # Keyword impact
-        base_score += keywords['interest'] * 5
-        base_score += keywords['buying_signals'] * 10
-        base_score += keywords['decision_maker'] * 8
-        base_score -= keywords['objection'] * 3
-        
-        return max(0, min(100, base_score))
-    
-    def calculate_engagement(self, text):
-        questions = text.count('?')
-        exclamations = text.count('!')
-        word_count = len(text.split())
-        
-        if word_count > 100:
-            return 'High'
-        elif word_count > 50:
-            return 'Medium'
-        else:
-            return 'Low'
-    
-    def generate_insights(self, keywords, sentiment, text):
-        insights = []
-        
-        if sentiment.polarity > 0.3:
-            insights.append("🟢 Positive sentiment detected - prospect is engaged")
-        elif sentiment.polarity < -0.1:
-            insights.append("🔴 Negative sentiment - address concerns immediately")
-        
-        if keywords['buying_signals'] > 0:
-            insights.append("💰 Buying signals detected - move to proposal stage")
-        
-        if keywords['objection'] > keywords['interest']:
-            insights.append("⚠️ High objection level - focus on value proposition")
-        
-        if keywords['decision_maker'] > 0:
-            insights.append("👑 Decision maker identified - prioritize this lead")
-        
-        if keywords['pain_points'] > 0:
-            insights.append("🎯 Pain points mentioned - align solution benefits")
-        
-        return insights
-
 def generate_coaching_recommendations(analysis):
     recommendations = []
     
@@ -250,8 +212,335 @@ def generate_coaching_recommendations(analysis):
     
     return recommendations
 
+def render_llm_results(llm_results, timing_context):
+    """Show the results of LLMService.run_analysis_pipeline.
+    
+    Takes plain dicts and lists only, so a saved analysis loaded from the
+    history renders exactly like a fresh one, without any LLM call.
+    """
+    llm_analysis = llm_results['analysis']
+    llm_score = llm_results['score']
+    llm_insights = llm_results['insights']
+    llm_coaching = llm_results['coaching']
+    if llm_results.get('tier') == 'local':
+        low, high = CASCADE_UNCERTAINTY_BAND
+        st.info(f"🔀 Cascade mode: the keyword score ({llm_score['overall_score']}) is outside the "
+                f"{low:g}-{high:g} review band, so these results come from local analysis without an LLM call")
+    
+    # Display conversation timing context
+    st.subheader("⏰ Conversation Context")
+    st.markdown("""
+    <div class="timing-context">
+        <div class="timing-metric">
+            <strong>📅 Date:</strong> {date}<br>
+            <strong>🕐 Time:</strong> {time}
+        </div>
+        <div class="timing-metric">
+            <strong>📊 Duration:</strong> {duration}<br>
+            <strong>📅 Day:</strong> {day}
+        </div>
+        <div class="timing-metric">
+            <strong>⏱️ Time Since:</strong> {time_since}<br>
+            <strong>📞 Follow-up:</strong> {follow_up_status}
+        </div>
+    </div>
+    """.format(
+        date=timing_context['date'],
+        time=timing_context['time'],
+        duration=timing_context['duration'],
+        day=timing_context['day_of_week'],
+        time_since=timing_context['time_since'],
+        follow_up_status=timing_context.get('follow_up_status', '')
+    ), unsafe_allow_html=True)
+    
+    # Display LLM results
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🤖 AI Analysis Results")
+        
+        # Lead Score
+        score = llm_score.get('overall_score', 50)
+        if score > 70:
+            score_class = "lead-score-high"
+            score_emoji = "🟢"
+        elif score > 40:
+            score_class = "lead-score-medium"
+            score_emoji = "🟡"
+        else:
+            score_class = "lead-score-low"
+            score_emoji = "🔴"
+        
+        st.markdown(f"""
+        <div class="{score_class}">
+            <h3>{score_emoji} Lead Score: {score}/100</h3>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Score breakdown
+        st.subheader("📊 Score Breakdown")
+        breakdown = llm_score.get('score_breakdown', {})
+        for category, points in breakdown.items():
+            st.metric(category.replace('_', ' ').title(), f"{points}/25")
+        
+        # Priority and timeline
+        st.metric("🎯 Priority Level", llm_score.get('priority_level', 'Medium'))
+        st.metric("⏰ Timeline", llm_score.get('timeline', 'This Week'))
+        st.metric("🎯 Confidence", llm_score.get('confidence_level', 'Medium'))
+    
+    with col2:
+        st.subheader("🔍 AI Analysis Details")
+        
+        # Sentiment and engagement
+        st.metric("😊 Sentiment Score", f"{llm_analysis.get('sentiment_score', 0.0):.2f}")
+        st.metric("🎯 Engagement Level", llm_analysis.get('engagement_level', 'Medium'))
+        st.metric("💰 Buying Intent", llm_analysis.get('buying_intent', 'Medium'))
+        st.metric("🚨 Urgency Level", llm_analysis.get('urgency_level', 'Low'))
+        
+        # Key topics
+        key_topics = llm_analysis.get('key_topics', [])
+        if key_topics:
+            st.subheader("📝 Key Topics")
+            for topic in key_topics:
+                st.markdown(f"• {topic}")
+    
+    # Advanced insights
+    st.subheader("💡 AI-Generated Insights")
+    for insight in llm_insights:
+        st.markdown(f"• {insight}")
+    
+    # Timing insights
+    timing_insights = llm_analysis.get('timing_insights', [])
+    if timing_insights:
+        st.subheader("⏰ Timing Insights")
+        for timing_insight in timing_insights:
+            st.markdown(f"• {timing_insight}")
+    
+    # Optimal follow-up time
+    optimal_time = llm_analysis.get('optimal_follow_up_time')
+    if optimal_time:
+        st.subheader("📞 Follow-up Recommendation")
+        if optimal_time == "Immediate":
+            st.success(f"🟢 **{optimal_time}** - Follow up right away while the conversation is fresh!")
+        elif optimal_time in ["Within 24h", "Within 48h"]:
+            st.warning(f"🟡 **{optimal_time}** - Good timing for follow-up")
+        else:
+            st.info(f"🔵 **{optimal_time}** - Plan your follow-up strategy")
+    
+    # Score explanation
+    st.subheader("📋 Score Explanation")
+    st.info(llm_score.get('score_explanation', 'Standard scoring applied'))
+    
+    # Coaching Recommendations
+    st.markdown("""
+    <div class="coaching-section">
+        <div class="coaching-header">🎯 AI Coaching Recommendations</div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if llm_coaching and len(llm_coaching) > 0:
+        # Check if coaching data is properly formatted
+        if isinstance(llm_coaching, list) and all(isinstance(rec, dict) for rec in llm_coaching):
+            for i, rec in enumerate(llm_coaching, 1):
+                priority_color = {
+                    'High': '🔴',
+                    'Medium': '🟡',
+                    'Low': '🟢',
+                    'Critical': '🚨'
+                }
+                
+                st.markdown(f"""
+                <div class="coaching-tip">
+                    <strong>{priority_color.get(rec.get('priority', 'Medium'), '⚪')} Recommendation #{i}: {rec.get('action', 'Follow up')}</strong>
+                    <em>Category: {rec.get('category', 'General')}</em><br>
+                    <em>Reason: {rec.get('reason', 'Based on conversation analysis')}</em><br>
+                    <strong>Script:</strong> {rec.get('script', 'Schedule a follow-up call to discuss next steps.')}<br>
+                    <em>Timeline: {rec.get('timeline', 'Within 48 hours')}</em><br>
+                    <em>Expected Outcome: {rec.get('expected_outcome', 'Continued engagement')}</em>
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            # Handle case where LLM returned a string or malformed data
+            st.warning("⚠️ Coaching recommendations format issue. Using fallback recommendations.")
+            st.info("LLM returned: " + str(type(llm_coaching)) + " - " + str(llm_coaching)[:200] + "...")
+            
+            # Provide fallback recommendations
+            fallback_recommendations = [
+                {
+                    'priority': 'Medium',
+                    'action': 'Schedule Follow-up Call',
+                    'category': 'Follow-up',
+                    'reason': 'Based on conversation analysis',
+                    'script': 'Thank you for your time. Let\'s schedule a follow-up call to discuss your needs in detail.',
+                    'timeline': 'Within 48 hours',
+                    'expected_outcome': 'Continued engagement and deeper discussion'
+                }
+            ]
+            
+            for i, rec in enumerate(fallback_recommendations, 1):
+                st.markdown(f"""
+                <div class="coaching-tip">
+                    <strong>🟡 Recommendation #{i}: {rec['action']}</strong>
+                    <em>Category: {rec['category']}</em><br>
+                    <em>Reason: {rec['reason']}</em><br>
+                    <strong>Script:</strong> {rec['script']}<br>
+                    <em>Timeline: {rec['timeline']}</em><br>
+                    <em>Expected Outcome: {rec['expected_outcome']}</em>
+                </div>
+                """, unsafe_allow_html=True)
+    else:
+        st.info("No specific coaching recommendations generated. This might indicate a straightforward conversation or limited data.")
+
+def render_email_stream(chunks):
+    """Show a streamed email as it arrives and return the full text.
+    
+    Stopping the app mid-stream closes the generator, which cancels the generation.
+    """
+    placeholder = st.empty()
+    email = ""
+    with closing(chunks):
+        for chunk in chunks:
+            email += chunk
+            placeholder.markdown(email + "▌")
+    placeholder.empty()
+    return email.strip()
+
+def render_history_browser():
+    """Browse saved analyses a page at a time.
+    
+    Filtering, sorting and paging run in the history database (keyset
+    pagination), and the chart plots per-hour buckets instead of every
+    analysis, so rendering cost depends on the page size, not the history size.
+    A saved analysis can be opened again from its stored results.
+    """
+    import pandas as pd
+    import plotly.express as px
+    from history_store import SORTABLE_COLUMNS, merge_buckets
+    history_store = get_history_store()
+    
+    if not history_store.count():
+        st.info("No analysis history found. Save your first analysis to see history here.")
+        return
+    
+    st.subheader("📊 Conversation Analysis History")
+    
+    # Display summary statistics
+    summary = history_store.summary((datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'))
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Analyses", summary['total'])
+    with col2:
+        st.metric("Avg Lead Score", f"{summary['avg_score']:.1f}")
+    with col3:
+        st.metric("This Week", summary['recent'])
+    with col4:
+        st.metric("High Priority", summary['high_priority'])
+    st.caption(
+        "Priority: " + " · ".join(f"{level} {count}" for level, count in summary['by_priority'].items()) +
+        " | Engagement: " + " · ".join(f"{level} {count}" for level, count in summary['by_engagement'].items())
+    )
+    
+    # Filter and sort options
+    st.subheader("🔍 Filter History")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        date_filter = st.date_input(
+            "Filter by Date",
+            value=datetime.now().date(),
+            help="Show analyses from this date",
+            key="history_date"
+        )
+        all_dates = st.checkbox("All dates", key="history_all_dates")
+    with col2:
+        priority_filter = st.selectbox("Filter by Priority", ["All", "High", "Medium", "Low"], key="history_priority")
+    with col3:
+        sort_by = st.selectbox("Sort by", SORTABLE_COLUMNS, format_func=lambda column: column.replace('_', ' ').title(),
+                               key="history_sort")
+        descending = st.checkbox("Newest / highest first", value=True, key="history_descending")
+    with col4:
+        page_size = st.selectbox("Rows per page", [25, 50, 100], index=1, key="history_page_size")
+    
+    filters = {
+        'conversation_date': date_filter.strftime('%Y-%m-%d') if date_filter and not all_dates else None,
+        'priority_level': priority_filter if priority_filter != "All" else None
+    }
+    
+    # Start of each page visited so far; a new query starts again from page one
+    query_key = (filters['conversation_date'], filters['priority_level'], sort_by, descending, page_size)
+    if st.session_state.get('history_query') != query_key:
+        st.session_state['history_query'] = query_key
+        st.session_state['history_cursors'] = [None]
+    cursors = st.session_state['history_cursors']
+    
+    rows, next_cursor = history_store.page(
+        **filters, sort_by=sort_by, descending=descending, page_size=page_size, cursor=cursors[-1],
+        columns=['conversation_date', 'conversation_time', 'conversation_duration', 'lead_score',
+                 'priority_level', 'engagement_level', 'optimal_follow_up_time']
+    )
+    
+    # Match count and chart buckets only change when the filters or the history do, so paging reuses them
+    stats_key = (filters['conversation_date'], filters['priority_level'], history_store.count())
+    if st.session_state.get('history_stats_key') != stats_key:
+        st.session_state['history_stats_key'] = stats_key
+        st.session_state['history_stats'] = None
+    
+    if rows:
+        if st.session_state['history_stats'] is None:
+            # Unfiltered and priority-only counts and buckets come from the aggregate tables;
+            # a picked date reads that day's rows, counting no further than HISTORY_COUNT_LIMIT
+            limit = HISTORY_COUNT_LIMIT + 1 if filters['conversation_date'] else None
+            matching = history_store.count_matching(**filters, limit=limit)
+            shown = f"{HISTORY_COUNT_LIMIT:,}+" if limit and matching == limit else f"{matching:,}"
+            history_archive = get_history_archive() if filters['conversation_date'] else None
+            if history_archive is not None:
+                buckets = merge_buckets(
+                    history_archive.score_buckets(**filters),
+                    history_store.score_buckets(**filters, after_id=history_archive.last_id)
+                )
+            else:
+                buckets = merge_buckets(history_store.score_buckets(**filters))
+            st.session_state['history_stats'] = (shown, buckets)
+        shown, buckets = st.session_state['history_stats']
+        st.caption(f"Page {len(cursors)} · {shown} matching analyses")
+        st.dataframe(rows, hide_index=True)
+        
+        col1, col2, _ = st.columns([1, 1, 4])
+        with col1:
+            st.button("⬅️ Previous", disabled=len(cursors) == 1, on_click=cursors.pop, key="history_previous")
+        with col2:
+            st.button("Next ➡️", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,),
+                      key="history_next")
+        
+        # Timing analysis chart from per-hour, per-priority buckets
+        st.subheader("⏰ Timing Analysis")
+        fig = px.scatter(pd.DataFrame(buckets), x='hour', y='avg_score', color='priority_level', size='count',
+                         title="Average Lead Score by Conversation Hour",
+                         labels={'hour': 'Hour of Day', 'avg_score': 'Avg Lead Score', 'count': 'Analyses'})
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Re-show a saved analysis from its stored results, without calling the LLM
+        labels = {row['id']: f"#{row['id']} · {row['conversation_date']} {row['conversation_time']} · "
+                             f"score {row['lead_score']}" for row in rows}
+        selected_id = st.selectbox("🗂️ Open a saved analysis", [None] + list(labels),
+                                   format_func=lambda record_id: "Select an analysis" if record_id is None else labels[record_id],
+                                   key="history_open")
+        if selected_id is not None:
+            payload = history_store.payload(selected_id)
+            if payload and payload['results']:
+                render_llm_results(payload['results']['results'], payload['results']['timing_context'])
+                if payload['conversation']:
+                    with st.expander("📝 Transcript"):
+                        st.text(payload['conversation'])
+            else:
+                st.info("This analysis was saved before full results were stored; only the summary above is available.")
+    else:
+        st.info("No analyses found with the selected filters.")
+
 def create_sample_data():
     """Generate sample lead data for demonstration"""
+    import numpy as np
+    import pandas as pd
+    
     np.random.seed(42)
     
     leads_data = []
@@ -273,21 +562,19 @@ def create_sample_data():
     
     return pd.DataFrame(leads_data)
 
-# Initialize analyzer
-analyzer = LeadAnalyzer()
-
 # Sidebar
 st.sidebar.title("🎯 Lead Generation Coach")
 st.sidebar.markdown("---")
 
 # Navigation
-page = st.sidebar.selectbox(
-    "Select Tool",
-    ["Dashboard", "Conversation Analysis", "Lead Scoring", "Coaching Hub", "Performance Analytics"]
-)
+page = st.sidebar.selectbox("Select Tool", APP_PAGES, key="page")
 
 # Main Content
+# Heavy libraries (pandas, numpy, plotly, textblob) are imported inside the
+# pages and handlers that use them, so each page only loads what it renders
 if page == "Dashboard":
+    import plotly.express as px
+    
     st.title("🎯 Lead Generation Dashboard")
     
     # Sample data
@@ -461,187 +748,17 @@ elif page == "Conversation Analysis":
                         follow_up_status = "🔴 Delayed"
                     
                     # Use LLM-powered analysis with timing context
-                    llm_analysis = llm_service.analyze_conversation_llm(conversation, timing_context)
-                    llm_score = llm_service.generate_lead_score_llm(llm_analysis)
-                    llm_insights = llm_service.generate_insights_llm(conversation, llm_analysis)
-                    llm_coaching = llm_service.generate_coaching_recommendations_llm(llm_analysis, llm_score)
-                    
-                    # Display conversation timing context
-                    st.subheader("⏰ Conversation Context")
-                    st.markdown("""
-                    <div class="timing-context">
-                        <div class="timing-metric">
-                            <strong>📅 Date:</strong> {date}<br>
-                            <strong>🕐 Time:</strong> {time}
-                        </div>
-                        <div class="timing-metric">
-                            <strong>📊 Duration:</strong> {duration}<br>
-                            <strong>📅 Day:</strong> {day}
-                        </div>
-                        <div class="timing-metric">
-                            <strong>⏱️ Time Since:</strong> {time_since}<br>
-                            <strong>📞 Follow-up:</strong> {follow_up_status}
-                        </div>
-                    </div>
-                    """.format(
-                        date=conversation_date.strftime('%m/%d/%Y'),
-                        time=conversation_time.strftime('%I:%M %p'),
-                        duration=conversation_duration,
-                        day=conversation_date.strftime('%A'),
-                        time_since=timing_context['time_since'],
-                        follow_up_status=follow_up_status
-                    ), unsafe_allow_html=True)
-                    
-                    # Display LLM results
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.subheader("🤖 AI Analysis Results")
-                        
-                        # Lead Score
-                        score = llm_score.get('overall_score', 50)
-                        if score > 70:
-                            score_class = "lead-score-high"
-                            score_emoji = "🟢"
-                        elif score > 40:
-                            score_class = "lead-score-medium"
-                            score_emoji = "🟡"
-                        else:
-                            score_class = "lead-score-low"
-                            score_emoji = "🔴"
-                        
-                        st.markdown(f"""
-                        <div class="{score_class}">
-                            <h3>{score_emoji} Lead Score: {score}/100</h3>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Score breakdown
-                        st.subheader("📊 Score Breakdown")
-                        breakdown = llm_score.get('score_breakdown', {})
-                        for category, points in breakdown.items():
-                            st.metric(category.replace('_', ' ').title(), f"{points}/25")
-                        
-                        # Priority and timeline
-                        st.metric("🎯 Priority Level", llm_score.get('priority_level', 'Medium'))
-                        st.metric("⏰ Timeline", llm_score.get('timeline', 'This Week'))
-                        st.metric("🎯 Confidence", llm_score.get('confidence_level', 'Medium'))
-                    
-                    with col2:
-                        st.subheader("🔍 AI Analysis Details")
-                        
-                        # Sentiment and engagement
-                        st.metric("😊 Sentiment Score", f"{llm_analysis.get('sentiment_score', 0.0):.2f}")
-                        st.metric("🎯 Engagement Level", llm_analysis.get('engagement_level', 'Medium'))
-                        st.metric("💰 Buying Intent", llm_analysis.get('buying_intent', 'Medium'))
-                        st.metric("🚨 Urgency Level", llm_analysis.get('urgency_level', 'Low'))
-                        
-                        # Key topics
-                        key_topics = llm_analysis.get('key_topics', [])
-                        if key_topics:
-                            st.subheader("📝 Key Topics")
-                            for topic in key_topics:
-                                st.markdown(f"• {topic}")
-                    
-                    # Advanced insights
-                    st.subheader("💡 AI-Generated Insights")
-                    for insight in llm_insights:
-                        st.markdown(f"• {insight}")
-                    
-                    # Timing insights
-                    timing_insights = llm_analysis.get('timing_insights', [])
-                    if timing_insights:
-                        st.subheader("⏰ Timing Insights")
-                        for timing_insight in timing_insights:
-                            st.markdown(f"• {timing_insight}")
-                    
-                    # Optimal follow-up time
-                    optimal_time = llm_analysis.get('optimal_follow_up_time')
-                    if optimal_time:
-                        st.subheader("📞 Follow-up Recommendation")
-                        if optimal_time == "Immediate":
-                            st.success(f"🟢 **{optimal_time}** - Follow up right away while the conversation is fresh!")
-                        elif optimal_time in ["Within 24h", "Within 48h"]:
-                            st.warning(f"🟡 **{optimal_time}** - Good timing for follow-up")
-                        else:
-                            st.info(f"🔵 **{optimal_time}** - Plan your follow-up strategy")
+                    # (insights are generated concurrently with scoring and coaching)
+                    llm_results = llm_service.run_analysis_pipeline(conversation, timing_context)
+                    llm_analysis = llm_results['analysis']
+                    llm_score = llm_results['score']
                     
-                    # Score explanation
-                    st.subheader("📋 Score Explanation")
-                    st.info(llm_score.get('score_explanation', 'Standard scoring applied'))
-                    
-                    # Coaching Recommendations
-                    st.markdown("""
-                    <div class="coaching-section">
-                        <div class="coaching-header">🎯 AI Coaching Recommendations</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    if llm_coaching and len(llm_coaching) > 0:
-                        # Check if coaching data is properly formatted
-                        if isinstance(llm_coaching, list) and all(isinstance(rec, dict) for rec in llm_coaching):
-                            for i, rec in enumerate(llm_coaching, 1):
-                                priority_color = {
-                                    'High': '🔴',
-                                    'Medium': '🟡',
-                                    'Low': '🟢',
-                                    'Critical': '🚨'
-                                }
-                                
-                                st.markdown(f"""
-                                <div class="coaching-tip">
-                                    <strong>{priority_color.get(rec.get('priority', 'Medium'), '⚪')} Recommendation #{i}: {rec.get('action', 'Follow up')}</strong>
-                                    <em>Category: {rec.get('category', 'General')}</em><br>
-                                    <em>Reason: {rec.get('reason', 'Based on conversation analysis')}</em><br>
-                                    <strong>Script:</strong> {rec.get('script', 'Schedule a follow-up call to discuss next steps.')}<br>
-                                    <em>Timeline: {rec.get('timeline', 'Within 48 hours')}</em><br>
-                                    <em>Expected Outcome: {rec.get('expected_outcome', 'Continued engagement')}</em>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        else:
-                            # Handle case where LLM returned a string or malformed data
-                            st.warning("⚠️ Coaching recommendations format issue. Using fallback recommendations.")
-                            st.info("LLM returned: " + str(type(llm_coaching)) + " - " + str(llm_coaching)[:200] + "...")
-                            
-                            # Provide fallback recommendations
-                            fallback_recommendations = [
-                                {
-                                    'priority': 'Medium',
-                                    'action': 'Schedule Follow-up Call',
-                                    'category': 'Follow-up',
-                                    'reason': 'Based on conversation analysis',
-                                    'script': 'Thank you for your time. Let\'s schedule a follow-up call to discuss your needs in detail.',
-                                    'timeline': 'Within 48 hours',
-                                    'expected_outcome': 'Continued engagement and deeper discussion'
-                                }
-                            ]
-                            
-                            for i, rec in enumerate(fallback_recommendations, 1):
-                                st.markdown(f"""
-                                <div class="coaching-tip">
-                                    <strong>🟡 Recommendation #{i}: {rec['action']}</strong>
-                                    <em>Category: {rec['category']}</em><br>
-                                    <em>Reason: {rec['reason']}</em><br>
-                                    <strong>Script:</strong> {rec['script']}<br>
-                                    <em>Timeline: {rec['timeline']}</em><br>
-                                    <em>Expected Outcome: {rec['expected_outcome']}</em>
-                                </div>
-                                """, unsafe_allow_html=True)
-                    else:
-                        st.info("No specific coaching recommendations generated. This might indicate a straightforward conversation or limited data.")
-                    
-                    # Follow-up email generation
-                    if st.button("📧 Generate Follow-up Email"):
-                        with st.spinner("Generating personalized email..."):
-                            email = llm_service.generate_follow_up_email_llm(conversation, llm_analysis)
-                            st.subheader("📧 AI-Generated Follow-up Email")
-                            st.text_area("Email Content:", value=email, height=300)
-                    
-                    # Save analysis option
-                    if st.button("💾 Save Analysis"):
-                        # Create analysis record
-                        analysis_record = {
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    # Kept for this session, so the email and save buttons below still have it after their rerun
+                    st.session_state['last_analysis'] = {
+                        'conversation': conversation,
+                        'results': llm_results,
+                        'timing_context': {**timing_context, 'follow_up_status': follow_up_status},
+                        'record': {
                             'conversation_date': conversation_date.strftime('%Y-%m-%d'),
                             'conversation_time': conversation_time.strftime('%H:%M'),
                             'conversation_duration': conversation_duration,
@@ -662,88 +779,10 @@ elif page == "Conversation Analysis":
                             'buying_signals': ', '.join(llm_analysis.get('buying_signals', [])),
                             'next_steps': ', '.join(llm_analysis.get('next_steps_suggested', []))
                         }
-                        
-                        # Save to CSV
-                        import os
-                        
-                        filename = 'conversation_analysis_history.csv'
-                        
-                        if os.path.exists(filename):
-                            # Append to existing file
-                            df = pd.read_csv(filename)
-                            df = pd.concat([df, pd.DataFrame([analysis_record])], ignore_index=True)
-                        else:
-                            # Create new file
-                            df = pd.DataFrame([analysis_record])
-                        
-                        df.to_csv(filename, index=False)
-                        st.success(f"✅ Analysis saved to {filename}")
-                        st.info(f"📊 Total analyses saved: {len(df)}")
-                    
-                    # View analysis history
-                    if st.button("📊 View Analysis History"):
-                        import os
-                        filename = 'conversation_analysis_history.csv'
-                        
-                        if os.path.exists(filename):
-                            df = pd.read_csv(filename)
-                            st.subheader("📊 Conversation Analysis History")
-                            
-                            # Display summary statistics
-                            col1, col2, col3, col4 = st.columns(4)
-                            with col1:
-                                st.metric("Total Analyses", len(df))
-                            with col2:
-                                avg_score = df['lead_score'].mean()
-                                st.metric("Avg Lead Score", f"{avg_score:.1f}")
-                            with col3:
-                                recent_analyses = df[df['timestamp'] >= (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')]
-                                st.metric("This Week", len(recent_analyses))
-                            with col4:
-                                high_priority = len(df[df['priority_level'] == 'High'])
-                                st.metric("High Priority", high_priority)
-                            
-                            # Filter options
-                            st.subheader("🔍 Filter History")
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                date_filter = st.date_input(
-                                    "Filter by Date",
-                                    value=datetime.now().date(),
-                                    help="Show analyses from this date"
-                                )
-                            with col2:
-                                priority_filter = st.selectbox(
-                                    "Filter by Priority",
-                                    ["All", "High", "Medium", "Low"]
-                                )
-                            
-                            # Apply filters
-                            filtered_df = df.copy()
-                            if date_filter:
-                                filtered_df = filtered_df[filtered_df['conversation_date'] == date_filter.strftime('%Y-%m-%d')]
-                            if priority_filter != "All":
-                                filtered_df = filtered_df[filtered_df['priority_level'] == priority_filter]
-                            
-                            # Display filtered results
-                            if len(filtered_df) > 0:
-                                st.dataframe(filtered_df[['conversation_date', 'conversation_time', 'conversation_duration', 
-                                                        'lead_score', 'priority_level', 'engagement_level', 'optimal_follow_up_time']])
-                                
-                                # Timing analysis chart
-                                st.subheader("⏰ Timing Analysis")
-                                fig = px.scatter(filtered_df, x='conversation_time', y='lead_score', 
-                                               color='priority_level', size='conversation_length',
-                                               title="Lead Score vs Conversation Time",
-                                               labels={'conversation_time': 'Time of Day', 'lead_score': 'Lead Score'})
-                                st.plotly_chart(fig, use_container_width=True)
-                            else:
-                                st.info("No analyses found with the selected filters.")
-                        else:
-                            st.info("No analysis history found. Save your first analysis to see history here.")
+                    }
                 else:
                     # Fallback to original analysis
-                    analysis = analyzer.analyze_conversation(conversation)
+                    analysis = get_analyzer().analyze_conversation(conversation)
                     
                     # Display fallback results
                     col1, col2 = st.columns(2)
@@ -776,6 +815,9 @@ elif page == "Conversation Analysis":
                         st.metric("📝 Word Count", analysis['word_count'])
                     
                     with col2:
+                        import pandas as pd
+                        import plotly.express as px
+                        
                         st.subheader("🔍 Keyword Analysis")
                         
                         keywords_df = pd.DataFrame(
@@ -818,6 +860,37 @@ elif page == "Conversation Analysis":
                         st.info("No specific coaching recommendations generated for this conversation.")
         else:
             st.warning("Please enter a conversation to analyze.")
+    
+    # Results of the last LLM analysis in this session
+    last_analysis = st.session_state.get('last_analysis')
+    if llm_service and last_analysis:
+        render_llm_results(last_analysis['results'], last_analysis['timing_context'])
+        
+        # Follow-up email generation
+        if st.button("📧 Generate Follow-up Email"):
+            st.subheader("📧 AI-Generated Follow-up Email")
+            email = render_email_stream(llm_service.stream_follow_up_email_llm(
+                last_analysis['conversation'], last_analysis['results']['analysis']))
+            st.text_area("Email Content:", value=email, height=300)
+        
+        # Save analysis option
+        if st.button("💾 Save Analysis"):
+            analysis_record = {'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), **last_analysis['record']}
+            
+            # One-row insert; the transcript and full results are stored compressed, once per distinct content
+            history_store = get_history_store()
+            history_store.add(
+                analysis_record, transcript=last_analysis['conversation'],
+                results={'results': last_analysis['results'], 'timing_context': last_analysis['timing_context']}
+            )
+            st.success(f"✅ Analysis saved to {history_store.path}")
+            st.info(f"📊 Total analyses saved: {history_store.count()}")
+    
+    # Saved analysis history; stays open across reruns so filters and paging work
+    if st.button("📊 View Analysis History"):
+        st.session_state['show_history'] = True
+    if st.session_state.get('show_history'):
+        render_history_browser()
 
 elif page == "Lead Scoring":
     st.title("⭐ Lead Scoring System")
@@ -1052,37 +1125,47 @@ elif page == "Coaching Hub":
                     ai_score = llm_service.generate_lead_score_llm(ai_analysis)
                     ai_coaching = llm_service.generate_coaching_recommendations_llm(ai_analysis, ai_score)
                     
-                    # Display AI coaching results
-                    st.subheader("🎯 AI Coaching Recommendations")
-                    
-                    for rec in ai_coaching:
-                        priority_color = {
-                            'High': '🔴',
-                            'Medium': '🟡',
-                            'Low': '🟢',
-                            'Critical': '🚨'
-                        }
-                        
-                        st.markdown(f"""
-                        <div class="coaching-tip">
-                            <strong>{priority_color.get(rec['priority'], '⚪')} {rec['action']}</strong><br>
-                            <em>Category: {rec['category']}</em><br>
-                            <em>Reason: {rec['reason']}</em><br>
-                            <strong>Script:</strong> {rec['script']}<br>
-                            <em>Timeline: {rec['timeline']}</em><br>
-                            <em>Expected Outcome: {rec['expected_outcome']}</em>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Generate follow-up email
-                    if st.button("📧 Generate AI Follow-up Email"):
-                        with st.spinner("Generating personalized email..."):
-                            email = llm_service.generate_follow_up_email_llm(coaching_conversation, ai_analysis)
-                            st.subheader("📧 AI-Generated Follow-up Email")
-                            st.text_area("Email Content:", email, height=300)
+                    # Kept for this session, so the email button below still has it after its rerun
+                    st.session_state['last_coaching'] = {
+                        'conversation': coaching_conversation,
+                        'analysis': ai_analysis,
+                        'coaching': ai_coaching
+                    }
             else:
                 st.warning("Please enter conversation text for AI coaching.")
         
+        # Results of the last AI coaching request in this session
+        last_coaching = st.session_state.get('last_coaching')
+        if last_coaching:
+            # Display AI coaching results
+            st.subheader("🎯 AI Coaching Recommendations")
+            
+            for rec in last_coaching['coaching']:
+                priority_color = {
+                    'High': '🔴',
+                    'Medium': '🟡',
+                    'Low': '🟢',
+                    'Critical': '🚨'
+                }
+                
+                st.markdown(f"""
+                <div class="coaching-tip">
+                    <strong>{priority_color.get(rec['priority'], '⚪')} {rec['action']}</strong><br>
+                    <em>Category: {rec['category']}</em><br>
+                    <em>Reason: {rec['reason']}</em><br>
+                    <strong>Script:</strong> {rec['script']}<br>
+                    <em>Timeline: {rec['timeline']}</em><br>
+                    <em>Expected Outcome: {rec['expected_outcome']}</em>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            # Generate follow-up email
+            if st.button("📧 Generate AI Follow-up Email"):
+                st.subheader("📧 AI-Generated Follow-up Email")
+                email = render_email_stream(llm_service.stream_follow_up_email_llm(
+                    last_coaching['conversation'], last_coaching['analysis']))
+                st.text_area("Email Content:", email, height=300)
+        
         st.markdown("---")
     
     # Traditional Coaching Categories
@@ -1170,6 +1253,10 @@ elif page == "Coaching Hub":
         st.info("In a full implementation, this would include role-play scenarios and feedback.")
 
 elif page == "Performance Analytics":
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    
     st.title("📈 Performance Analytics")
     
     # Generate sample performance data
@@ -1264,6 +1351,22 @@ elif page == "Performance Analytics":
         </div>
         """, unsafe_allow_html=True)
 
+# LLM call metrics (latency, tokens, fallbacks, cache hit rate), once a page has loaded the service
+llm_service = get_llm_service() if st.session_state.get('llm_service_loaded') else None
+if llm_service:
+    llm_service.export_metrics()
+    with st.sidebar.expander("📈 LLM Metrics"):
+        st.dataframe(llm_service.metrics.summary_rows(), hide_index=True)
+        tier_rows = llm_service.metrics.tier_rows()
+        if tier_rows:
+            st.caption("Cascade tiers")
+            st.dataframe(tier_rows, hide_index=True)
+        st.download_button(
+            "Download Prometheus metrics",
+            llm_service.metrics.to_prometheus(),
+            file_name="llm_metrics.prom"
+        )
+
 # Footer
 st.markdown("---")
 st.markdown("🚀 **LLM Lead Generation Coaching Tool** - Powered by AI Analytics")
@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+from typing import Dict, Any, Iterator, Optional
+from config import (
+    TOGETHER_API_KEY, LLM_BACKEND, LLM_RECORD_PATH, LLM_REPLAY_PATH,
+    LLM_REPLAY_LATENCY_MS, LLM_REPLAY_LATENCY_SIGMA, LLM_REPLAY_ERROR_RATE
+)
+from llm_cache import LLMResponseCache
+
+class LLMBackend:
+    """Completion provider used by LLMService.
+
+    `complete` returns the full completion text; `stream` yields it in chunks.
+    Backends without native streaming yield the whole completion at once.
+    """
+
+    name = 'base'
+    supports_streaming = False
+
+    def complete(self, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def stream(self, model: str, prompt: str, params: Dict[str, Any]) -> Iterator[str]:
+        yield self.complete(model, prompt, params)
+
+class TogetherBackend(LLMBackend):
+    """Together AI completions via the `together` SDK"""
+
+    name = 'together'
+
+    def __init__(self, api_key: str = TOGETHER_API_KEY):
+        import together
+        together.api_key = api_key
+        self._complete_api = together.Complete
+        self.supports_streaming = hasattr(together.Complete, 'create_streaming')
+
+    def complete(self, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        response = self._complete_api.create(model=model, prompt=prompt, **params)
+        return response['choices'][0]['text']
+
+    def stream(self, model: str, prompt: str, params: Dict[str, Any]) -> Iterator[str]:
+        stream = self._complete_api.create_streaming(model=model, prompt=prompt, **params)
+        try:
+            for chunk in stream:
+                yield chunk
+        finally:
+            # Closing the upstream stream stops generation when the caller stops early
+            if hasattr(stream, 'close'):
+                stream.close()
+
+class RecordingBackend(LLMBackend):
+    """Pass requests to another backend and append each exchange to a JSONL file"""
+
+    name = 'record'
+
+    def __init__(self, inner: LLMBackend, path: str = LLM_RECORD_PATH):
+        self.inner = inner
+        self.path = path
+        self.supports_streaming = inner.supports_streaming
+        self._lock = threading.Lock()
+
+    def complete(self, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        start = time.perf_counter()
+        text = self.inner.complete(model, prompt, params)
+        self._record(model, prompt, params, text, time.perf_counter() - start, complete=True)
+        return text
+
+    def stream(self, model: str, prompt: str, params: Dict[str, Any]) -> Iterator[str]:
+        start = time.perf_counter()
+        chunks = []
+        finished = False
+        try:
+            for chunk in self.inner.stream(model, prompt, params):
+                chunks.append(chunk)
+                yield chunk
+            finished = True
+        finally:
+            # Streams stopped early (e.g. once the JSON closed) are recorded as far as they got
+            if chunks:
+                self._record(model, prompt, params, ''.join(chunks), time.perf_counter() - start, complete=finished)
+
+    def _record(self, model: str, prompt: str, params: Dict[str, Any], text: str, latency: float, complete: bool):
+        record = {
+            'key': LLMResponseCache.make_key(model, params, prompt),
+            'model': model,
+            'params': params,
+            'prompt': prompt,
+            'text': text,
+            'latency_ms': round(latency * 1000, 1),
+            'complete': complete,
+            'recorded_at': time.time()
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+class SimulatedServiceUnavailableError(Exception):
+    """Injected provider failure; looks transient to the retry policy"""
+    status_code = 503
+
+class IncompleteRecordingError(LookupError):
+    """A replayed stream was read past the point where its recording stopped"""
+
+class ReplayBackend(LLMBackend):
+    """Serve completions recorded by RecordingBackend, with simulated latency and errors.
+
+    Latency per call is drawn from a log-normal distribution with the given
+    median and sigma; `error_rate` is the probability of a simulated 503.
+    Requests that were never recorded raise LookupError, so the service
+    falls back exactly as it would on a provider error.
+
+    Streams the recorder's reader stopped early (complete=False) are only
+    the text up to that point. They replay as streams, raising
+    IncompleteRecordingError if read past the recorded text, and are never
+    served as a full completion; a complete recording of the same request
+    is always preferred.
+    """
+
+    name = 'replay'
+    supports_streaming = True
+
+    def __init__(self, path: str = LLM_REPLAY_PATH, latency_ms: float = LLM_REPLAY_LATENCY_MS,
+                 latency_sigma: float = LLM_REPLAY_LATENCY_SIGMA, error_rate: float = LLM_REPLAY_ERROR_RATE,
+                 seed: Optional[int] = None, chunk_chars: int = 16):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.chunk_chars = chunk_chars
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # key -> (text, complete)
+        self._responses = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    complete = record.get('complete', True)
+                    # Later recordings of the same request replace earlier ones, but never with a partial one
+                    if complete or not self._responses.get(record['key'], ('', False))[1]:
+                        self._responses[record['key']] = (record['text'], complete)
+
+    def _simulate(self) -> float:
+        """Draw this call's latency in seconds, raising a simulated error if one is due"""
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            latency = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma) / 1000 if self.latency_ms else 0.0
+        if failed:
+            time.sleep(latency)
+            raise SimulatedServiceUnavailableError("Simulated provider outage")
+        return latency
+
+    def _lookup(self, model: str, prompt: str, params: Dict[str, Any]):
+        """The recorded (text, complete) for a request"""
+        key = LLMResponseCache.make_key(model, params, prompt)
+        if key not in self._responses:
+            raise LookupError(f"No recorded completion for request {key[:12]}")
+        return self._responses[key]
+
+    def complete(self, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        latency = self._simulate()
+        text, complete = self._lookup(model, prompt, params)
+        if not complete:
+            raise IncompleteRecordingError("Only part of this completion was recorded (the stream was stopped early)")
+        time.sleep(latency)
+        return text
+
+    def stream(self, model: str, prompt: str, params: Dict[str, Any]) -> Iterator[str]:
+        latency = self._simulate()
+        text, complete = self._lookup(model, prompt, params)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or ['']
+        # Spread the simulated latency over the chunks, like tokens arriving
+        delay = latency / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+        if not complete:
+            raise IncompleteRecordingError("The recorded stream ends here (it was stopped early)")
+
+def create_backend(kind: str = LLM_BACKEND) -> Optional[LLMBackend]:
+    """Build the backend selected in config, or None if it cannot be used"""
+    if kind == 'replay':
+        return ReplayBackend()
+    if not TOGETHER_API_KEY:
+        return None
+    if kind == 'record':
+        return RecordingBackend(TogetherBackend())
+    return TogetherBackend()
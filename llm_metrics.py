@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Iterable, List
+from config import MODELS, LLM_LATENCY_BUCKETS
+
+# Counters kept for every task
+COUNTERS = (
+    'requests', 'errors', 'circuit_open', 'parse_failures', 'fallbacks',
+    'cache_hits', 'cache_misses', 'prompt_tokens', 'completion_tokens'
+)
+
+class LLMMetrics:
+    """Per-task latency histograms and counters for LLMService.
+
+    Tasks are the keys of config.MODELS. Latency covers provider calls
+    (including retries), not cache hits. Token counts are local estimates.
+    Cascade mode also records end-to-end latency per tier ('local' or 'llm').
+    """
+
+    def __init__(self, tasks: Iterable[str] = MODELS, buckets: Iterable[float] = LLM_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._tiers = {}
+        for task in tasks:
+            self._add_task(task)
+
+    def _add_task(self, task: str) -> Dict[str, Any]:
+        stats = {
+            'counters': dict.fromkeys(COUNTERS, 0),
+            # Non-cumulative counts per bucket; the last slot is +Inf
+            'latency_buckets': [0] * (len(self.buckets) + 1),
+            'latency_sum': 0.0,
+            'latency_count': 0
+        }
+        self._tasks[task] = stats
+        return stats
+
+    def _stats(self, task: str) -> Dict[str, Any]:
+        return self._tasks.get(task) or self._add_task(task)
+
+    def increment(self, task: str, counter: str, amount: int = 1):
+        """Add to one of the task's counters"""
+        with self._lock:
+            self._stats(task)['counters'][counter] += amount
+
+    def observe_latency(self, task: str, seconds: float):
+        """Record one provider call's wall-clock latency"""
+        with self._lock:
+            self._observe(self._stats(task), seconds)
+
+    def observe_tier(self, tier: str, seconds: float):
+        """Record one cascade analysis answered by a tier, with its end-to-end latency"""
+        with self._lock:
+            stats = self._tiers.get(tier) or self._tiers.setdefault(tier, {
+                'latency_buckets': [0] * (len(self.buckets) + 1),
+                'latency_sum': 0.0,
+                'latency_count': 0
+            })
+            self._observe(stats, seconds)
+
+    def _observe(self, stats: Dict[str, Any], seconds: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        stats['latency_buckets'][index] += 1
+        stats['latency_sum'] += seconds
+        stats['latency_count'] += 1
+
+    def _quantile(self, stats: Dict[str, Any], fraction: float) -> float:
+        """Approximate a latency quantile by the upper bound of its bucket"""
+        count = stats['latency_count']
+        if not count:
+            return 0.0
+        rank = fraction * count
+        seen = 0
+        for i, bucket_count in enumerate(stats['latency_buckets']):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable copy of every task's metrics"""
+        with self._lock:
+            tasks = {}
+            for task, stats in self._tasks.items():
+                counters = stats['counters']
+                lookups = counters['cache_hits'] + counters['cache_misses']
+                count = stats['latency_count']
+                tasks[task] = {
+                    **counters,
+                    'cache_hit_rate': counters['cache_hits'] / lookups if lookups else 0.0,
+                    'latency': {
+                        'count': count,
+                        'sum_seconds': stats['latency_sum'],
+                        'mean_seconds': stats['latency_sum'] / count if count else 0.0,
+                        'p50_seconds': self._quantile(stats, 0.50),
+                        'p95_seconds': self._quantile(stats, 0.95),
+                        'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], stats['latency_buckets']))
+                    }
+                }
+            tiers = {
+                tier: {
+                    'count': stats['latency_count'],
+                    'mean_seconds': stats['latency_sum'] / stats['latency_count'],
+                    'p50_seconds': self._quantile(stats, 0.50),
+                    'p95_seconds': self._quantile(stats, 0.95)
+                }
+                for tier, stats in self._tiers.items()
+            }
+            return {'started_at': self.started_at, 'timestamp': time.time(), 'tasks': tasks, 'cascade_tiers': tiers}
+
+    def summary_rows(self) -> List[Dict[str, Any]]:
+        """One flat row per task, for display in a table"""
+        rows = []
+        for task, stats in self.snapshot()['tasks'].items():
+            latency = stats['latency']
+            rows.append({
+                'task': task,
+                'calls': latency['count'],
+                'p50_s': latency['p50_seconds'],
+                'p95_s': latency['p95_seconds'],
+                'mean_s': round(latency['mean_seconds'], 3),
+                'prompt_tokens': stats['prompt_tokens'],
+                'completion_tokens': stats['completion_tokens'],
+                'parse_failures': stats['parse_failures'],
+                'fallbacks': stats['fallbacks'],
+                'cache_hit_rate': round(stats['cache_hit_rate'], 3)
+            })
+        return rows
+
+    def tier_rows(self) -> List[Dict[str, Any]]:
+        """One flat row per cascade tier, with its share of all cascade analyses"""
+        tiers = self.snapshot()['cascade_tiers']
+        total = sum(stats['count'] for stats in tiers.values())
+        return [
+            {
+                'tier': tier,
+                'analyses': stats['count'],
+                'share': round(stats['count'] / total, 3),
+                'mean_s': round(stats['mean_seconds'], 3),
+                'p50_s': stats['p50_seconds'],
+                'p95_s': stats['p95_seconds']
+            }
+            for tier, stats in tiers.items()
+        ]
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP llm_request_duration_seconds Latency of LLM provider calls, including retries.',
+                '# TYPE llm_request_duration_seconds histogram'
+            ]
+            for task, stats in self._tasks.items():
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], stats['latency_buckets']):
+                    cumulative += bucket_count
+                    lines.append(f'llm_request_duration_seconds_bucket{{task="{task}",le="{bound}"}} {cumulative}')
+                lines.append(f'llm_request_duration_seconds_sum{{task="{task}"}} {stats["latency_sum"]}')
+                lines.append(f'llm_request_duration_seconds_count{{task="{task}"}} {stats["latency_count"]}')
+
+            for counter in COUNTERS:
+                lines.append(f'# TYPE llm_{counter}_total counter')
+                for task, stats in self._tasks.items():
+                    lines.append(f'llm_{counter}_total{{task="{task}"}} {stats["counters"][counter]}')
+
+            if self._tiers:
+                lines.append('# HELP llm_cascade_duration_seconds End-to-end cascade analysis latency by answering tier.')
+                lines.append('# TYPE llm_cascade_duration_seconds histogram')
+                for tier, stats in self._tiers.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], stats['latency_buckets']):
+                        cumulative += bucket_count
+                        lines.append(f'llm_cascade_duration_seconds_bucket{{tier="{tier}",le="{bound}"}} {cumulative}')
+                    lines.append(f'llm_cascade_duration_seconds_sum{{tier="{tier}"}} {stats["latency_sum"]}')
+                    lines.append(f'llm_cascade_duration_seconds_count{{tier="{tier}"}} {stats["latency_count"]}')
+            return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Atomically write a Prometheus textfile (e.g. for node_exporter's textfile collector)"""
+        self._write_atomic(path, self.to_prometheus())
+
+    def write_json(self, path: str):
+        """Atomically write a JSON snapshot"""
+        self._write_atomic(path, self.to_json())
+
+    def _write_atomic(self, path: str, content: str):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from typing import Optional
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from config import LLM_RETRY_POLICY, LLM_CIRCUIT_BREAKER
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_MARKERS = ('timeout', 'connection', 'ratelimit', 'servererror', 'serviceunavailable', 'tryagain')
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+
+class RequestPermit:
+    """Leave from the circuit breaker to send one request; `probe` marks the half-open trial request"""
+
+    __slots__ = ('probe',)
+
+    def __init__(self, probe: bool = False):
+        self.probe = probe
+
+class CircuitBreaker:
+    """Stop calling a failing provider for a cool-down window.
+
+    After `failure_threshold` consecutive transient failures the breaker opens
+    and every request is rejected until `cooldown_seconds` have passed. Then a
+    single probe request is let through: success closes the breaker, failure
+    opens it for another cool-down. A request that ends any other way (a
+    non-transient error, a stream abandoned by its reader) passes its permit
+    to release_probe(), which frees the probe slot only if that request was
+    the probe, so the next request can probe again.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_CIRCUIT_BREAKER['failure_threshold'],
+                 cooldown_seconds: float = LLM_CIRCUIT_BREAKER['cooldown_seconds']):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> Optional[RequestPermit]:
+        """A permit if a request may be sent to the provider now, else None"""
+        with self._lock:
+            if self.state == 'closed':
+                return RequestPermit()
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    return None
+                self.state = 'half_open'
+                self._probe = None
+            if self._probe is not None:
+                return None
+            self._probe = RequestPermit(probe=True)
+            return self._probe
+
+    def record_success(self):
+        """Close the breaker after a successful call"""
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._probe = None
+
+    def release_probe(self, permit: RequestPermit):
+        """End a request without recording an outcome; if it was the probe, the next request may probe"""
+        with self._lock:
+            if permit is self._probe:
+                self._probe = None
+
+    def record_failure(self) -> bool:
+        """Count a transient failure; return True if this opened the breaker"""
+        with self._lock:
+            self._failures += 1
+            self._probe = None
+            if self.state == 'half_open' or (self.state == 'closed' and self._failures >= self.failure_threshold):
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts: int = LLM_RETRY_POLICY['max_attempts'],
+                 base_delay: float = LLM_RETRY_POLICY['base_delay'],
+                 max_delay: float = LLM_RETRY_POLICY['max_delay']):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying after the given (0-based) failed attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+def is_transient_error(error: Exception) -> bool:
+    """Guess whether an error from the provider is worth retrying"""
+    if isinstance(error, (FuturesTimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS_CODES
+    name = type(error).__name__.lower()
+    return any(marker in name for marker in TRANSIENT_ERROR_MARKERS)
+
+def call_with_timeout(func, timeout_seconds: float, *args, **kwargs):
+    """Call func, raising TimeoutError if it takes longer than timeout_seconds.
+
+    The SDK call has no timeout of its own, so it runs on a thread of its
+    own that is abandoned (left to finish in the background) when the
+    deadline passes. With one thread per call the deadline covers only the
+    call itself, never time spent waiting behind other calls, and abandoned
+    calls cannot hold up later ones.
+    """
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, name="llm-call", daemon=True)
+    thread.start()
+    thread.join(timeout_seconds)
+    if thread.is_alive():
+        raise TimeoutError(f"LLM call timed out after {timeout_seconds:g}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
@@ -1,28 +1,74 @@
-import together
-import json
+import threading
+import time
 import streamlit as st
-from typing import Dict, List, Any, Optional
-from config import TOGETHER_API_KEY, DEFAULT_MODEL_PARAMS, MODELS
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+from config import (
+    DEFAULT_MODEL_PARAMS, MODELS, LLM_MAX_WORKERS, LLM_CONCURRENT_PIPELINE,
+    LLM_ANALYSIS_MODE, FULL_REPORT_MAX_TOKENS, LLM_BATCH_CONCURRENCY, LLM_TIMEOUT_SECONDS, LLM_STREAM_JSON,
+    LLM_METRICS_PROM_PATH, LLM_METRICS_JSON_PATH, CASCADE_UNCERTAINTY_BAND, CASCADE_LLM_MODE
+)
+from json_extract import JSONExtractor, extract_json, matches_schema
+from prompt_builder import (
+    ANALYSIS_TEMPLATE, LEAD_SCORE_TEMPLATE, COACHING_TEMPLATE, INSIGHTS_TEMPLATE, FOLLOW_UP_EMAIL_TEMPLATE,
+    FULL_REPORT_TEMPLATE, build_timing_info, estimate_tokens, render_prompt
+)
+from llm_backends import LLMBackend, create_backend
+from llm_cache import LLMResponseCache
+from llm_metrics import LLMMetrics
+from llm_resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_timeout, is_transient_error
+
+# Minimal shape checks for each task's JSON output (see json_extract.matches_schema)
+ANALYSIS_SCHEMA = {'type': dict, 'required': ('engagement_level', 'buying_intent')}
+SCORE_SCHEMA = {'type': dict, 'required': ('overall_score',)}
+INSIGHTS_SCHEMA = {'type': list, 'items': str}
+COACHING_SCHEMA = {'type': list, 'items': dict}
+FULL_REPORT_SCHEMA = {'type': dict, 'required': ('analysis', 'score')}
+# Pipelines an escalated cascade lead may run ('cascade' itself would recurse)
+CASCADE_LLM_MODES = ('staged', 'full_report')
 
 class LLMService:
-    def __init__(self):
-        self.api_key_available = bool(TOGETHER_API_KEY)
+    def __init__(self, concurrent_pipeline: bool = LLM_CONCURRENT_PIPELINE, analysis_mode: str = LLM_ANALYSIS_MODE,
+                 cache: Optional[LLMResponseCache] = None, backend: Optional[LLMBackend] = None,
+                 cascade_llm_mode: str = CASCADE_LLM_MODE):
+        self.cache = cache
+        self.metrics = LLMMetrics()
+        # Shared resilience policy for every provider call made by this service
+        self.timeout_seconds = LLM_TIMEOUT_SECONDS
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        self.concurrent_pipeline = concurrent_pipeline
+        # 'staged' makes one call per result, 'full_report' asks for all of them in one completion,
+        # 'cascade' only calls the LLM when the keyword score is inside the uncertainty band
+        self.analysis_mode = analysis_mode
+        self.cascade_band = CASCADE_UNCERTAINTY_BAND
+        if cascade_llm_mode not in CASCADE_LLM_MODES:
+            raise ValueError(f"Unknown cascade LLM mode {cascade_llm_mode!r}; expected one of {', '.join(CASCADE_LLM_MODES)}")
+        self.cascade_llm_mode = cascade_llm_mode
+        self._local_analyzer = None
+        # Worker threads for overlapping independent pipeline stages
+        self._executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+        self._local = threading.local()
         
-        if not self.api_key_available:
-            # Don't initialize Together client if no API key
-            self.client = None
+        if backend is not None:
+            self.client = backend
         else:
             try:
-                together.api_key = TOGETHER_API_KEY
-                # Together AI now uses Complete.create() method
-                self.client = together.Complete
+                # Together AI unless LLM_BACKEND selects record/replay; None without an API key
+                self.client = create_backend()
             except Exception as e:
-                self._show_warning(f"Failed to initialize Together AI client: {str(e)}")
+                self._show_warning(f"Failed to initialize LLM backend: {str(e)}")
                 self.client = None
-                self.api_key_available = False
+        self.api_key_available = self.client is not None
     
     def _show_warning(self, message: str):
         """Safely show warning in Streamlit or print to console"""
+        # Worker threads have no Streamlit script context, so their warnings
+        # are collected and shown by the calling thread instead
+        deferred = getattr(self._local, 'warnings', None)
+        if deferred is not None:
+            deferred.append(message)
+            return
         try:
             if hasattr(st, 'warning'):
                 st.warning(message)
@@ -31,89 +77,408 @@ class LLMService:
         except:
             print(f"Warning: {message}")
     
+    def export_metrics(self, prometheus_path: Optional[str] = LLM_METRICS_PROM_PATH, json_path: Optional[str] = LLM_METRICS_JSON_PATH):
+        """Write the metrics to the configured Prometheus textfile and/or JSON snapshot"""
+        if prometheus_path:
+            self.metrics.write_prometheus(prometheus_path)
+        if json_path:
+            self.metrics.write_json(json_path)
+    
+    def _complete(self, task: str, prompt: str, schema: Optional[Dict[str, Any]] = None, max_tokens: Optional[int] = None):
+        """Run one completion for a task through the response cache.
+        
+        With a schema, returns the first JSON value in the completion that
+        matches it (or None), and only completions that match are cached.
+        Without one, returns the raw completion text.
+        """
+        model = MODELS[task]
+        params = dict(DEFAULT_MODEL_PARAMS)
+        if max_tokens is not None:
+            params['max_tokens'] = max_tokens
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(model, params, prompt)
+            cached_text = self.cache.get(cache_key)
+            if cached_text is not None:
+                result = extract_json(cached_text, schema) if schema else cached_text
+                if result is not None:
+                    self.metrics.increment(task, 'cache_hits')
+                    return result
+            self.metrics.increment(task, 'cache_misses')
+        
+        self.metrics.increment(task, 'requests')
+        start = time.perf_counter()
+        try:
+            if schema and LLM_STREAM_JSON and self.client.supports_streaming:
+                result_text = self._call_with_retries(self._stream_json_completion, schema, model, prompt, params)
+            else:
+                result_text = self._call_with_retries(self.client.complete, model, prompt, params)
+        except CircuitOpenError:
+            self.metrics.increment(task, 'circuit_open')
+            raise
+        except Exception:
+            self.metrics.increment(task, 'errors')
+            self.metrics.observe_latency(task, time.perf_counter() - start)
+            raise
+        self.metrics.observe_latency(task, time.perf_counter() - start)
+        self.metrics.increment(task, 'prompt_tokens', estimate_tokens(prompt))
+        self.metrics.increment(task, 'completion_tokens', estimate_tokens(result_text))
+        
+        result = extract_json(result_text, schema) if schema else result_text
+        if result is None:
+            self.metrics.increment(task, 'parse_failures')
+        elif cache_key is not None:
+            self.cache.set(cache_key, result_text)
+        return result
+    
+    def _stream_json_completion(self, schema: Dict[str, Any], model: str, prompt: str, params: Dict[str, Any]) -> str:
+        """Stream a completion and stop as soon as a JSON value matching schema has closed.
+        
+        Returns the text up to the end of the JSON value, so tokens after it
+        are never generated.
+        """
+        extractor = JSONExtractor(schema)
+        chunks = []
+        stream = self.client.stream(model, prompt, params)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                if extractor.feed(chunk) is not None:
+                    break
+        finally:
+            stream.close()
+        
+        text = ''.join(chunks)
+        if extractor.done:
+            text = text[:extractor.consumed]
+        return text
+    
+    def _call_with_retries(self, func, *args):
+        """Call the provider with a timeout, retrying transient errors behind the circuit breaker.
+        
+        Raises CircuitOpenError without calling the provider while the breaker
+        is open, so callers can go straight to their fallback.
+        """
+        for attempt in range(self.retry_policy.max_attempts):
+            permit = self.circuit_breaker.allow_request()
+            if permit is None:
+                raise CircuitOpenError("LLM circuit breaker is open")
+            try:
+                response = call_with_timeout(func, self.timeout_seconds, *args)
+            except Exception as e:
+                if not is_transient_error(e):
+                    # The provider answered, so this says nothing about its health; free the probe slot if ours
+                    self.circuit_breaker.release_probe(permit)
+                    raise
+                if self.circuit_breaker.record_failure():
+                    self._show_warning(
+                        f"The LLM provider appears to be unavailable. Using fallback results for the next "
+                        f"{self.circuit_breaker.cooldown_seconds:.0f} seconds."
+                    )
+                if attempt == self.retry_policy.max_attempts - 1:
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+            else:
+                self.circuit_breaker.record_success()
+                return response
+    
+    def _call_deferring_warnings(self, warnings: List[str], func, *args):
+        """Run func on a worker thread, collecting its warnings into the given list"""
+        self._local.warnings = warnings
+        try:
+            return func(*args)
+        finally:
+            self._local.warnings = None
+    
+    def run_analysis_pipeline(self, conversation: str, timing_context: dict = None, concurrent: Optional[bool] = None, mode: Optional[str] = None) -> Dict[str, Any]:
+        """Run analysis -> (score || insights) -> coaching and return all four results.
+        
+        Insights only depend on the analysis, so in concurrent mode they are
+        generated on a worker thread while scoring and coaching run here.
+        In 'full_report' mode all four come from a single completion instead.
+        """
+        if concurrent is None:
+            concurrent = self.concurrent_pipeline
+        if mode is None:
+            mode = self.analysis_mode
+        
+        if mode == 'cascade':
+            return self.run_cascade(conversation, timing_context, concurrent)
+        if mode == 'full_report':
+            return self.generate_full_report_llm(conversation, timing_context)
+        
+        analysis = self.analyze_conversation_llm(conversation, timing_context)
+        
+        if not concurrent or not self.api_key_available or not self.client:
+            score = self.generate_lead_score_llm(analysis)
+            insights = self.generate_insights_llm(conversation, analysis)
+            coaching = self.generate_coaching_recommendations_llm(analysis, score)
+        else:
+            warnings = []
+            insights_future = self._executor.submit(
+                self._call_deferring_warnings, warnings, self.generate_insights_llm, conversation, analysis
+            )
+            score = self.generate_lead_score_llm(analysis)
+            coaching = self.generate_coaching_recommendations_llm(analysis, score)
+            insights = insights_future.result()
+            for message in warnings:
+                self._show_warning(message)
+        
+        return {
+            'analysis': analysis,
+            'score': score,
+            'insights': insights,
+            'coaching': coaching
+        }
+    
+    def run_cascade(self, conversation: str, timing_context: dict = None, concurrent: Optional[bool] = None) -> Dict[str, Any]:
+        """Score with the keyword analyzer first and only escalate ambiguous leads to the LLM.
+        
+        A keyword lead score inside `cascade_band` runs the `cascade_llm_mode`
+        pipeline; anything clearly hot or cold is answered locally with results
+        of the same shape. Either way the result also holds the answering
+        `tier` ('local' or 'llm') and the keyword `local_analysis`, and the
+        tier's end-to-end latency is recorded in the metrics.
+        """
+        start = time.perf_counter()
+        local = self.local_analyzer.analyze_conversation(conversation)
+        if self.needs_llm(local['lead_score']):
+            tier = 'llm'
+            results = self.run_analysis_pipeline(conversation, timing_context, concurrent, mode=self.cascade_llm_mode)
+        else:
+            tier = 'local'
+            results = self._local_pipeline_result(local, conversation, timing_context)
+        self.metrics.observe_tier(tier, time.perf_counter() - start)
+        return {**results, 'tier': tier, 'local_analysis': local}
+    
+    @property
+    def local_analyzer(self):
+        """The keyword LeadAnalyzer used as the cascade's first tier, created on first use"""
+        if self._local_analyzer is None:
+            from lead_analyzer import LeadAnalyzer
+            self._local_analyzer = LeadAnalyzer()
+        return self._local_analyzer
+    
+    def needs_llm(self, lead_score: float) -> bool:
+        """Whether a keyword lead score is too ambiguous to answer without the LLM"""
+        low, high = self.cascade_band
+        return low <= lead_score <= high
+    
+    def _local_pipeline_result(self, local: Dict[str, Any], conversation: str, timing_context: dict = None) -> Dict[str, Any]:
+        """Shape a keyword analysis like run_analysis_pipeline's results"""
+        counts = local['keyword_counts']
+        phrases = {
+            category: sorted({' '.join(conversation[start:end].lower().split()) for start, end in spans})
+            for category, spans in local['keyword_positions'].items()
+        }
+        # Routing uses the raw score, like needs_llm; rounding is for display only
+        raw_score = float(local['lead_score'])
+        score = int(round(raw_score))
+        positive = local['sentiment'].polarity > 0.1
+        hot = raw_score > self.cascade_band[1]
+        
+        analysis = self._default_analysis(timing_context)
+        analysis.update({
+            "sentiment_score": round(float(local['sentiment'].polarity), 3),
+            "engagement_level": local['engagement_level'],
+            "buying_intent": "High" if counts['buying_signals'] else ("Medium" if counts['interest'] else "Low"),
+            "key_topics": phrases['interest'][:5] or ["general discussion"],
+            "pain_points": phrases['pain_points'],
+            "objections": phrases['objection'],
+            "buying_signals": phrases['buying_signals'],
+            "decision_maker_indicators": phrases['decision_maker'],
+            "lead_quality": "Good" if hot else "Poor",
+            "opportunity_size": "Medium" if hot else "Small"
+        })
+        if not hot:
+            analysis["next_steps_suggested"] = ["Add to nurture sequence"]
+        
+        score_data = {
+            "overall_score": score,
+            "score_breakdown": {},
+            "score_explanation": (
+                f"Keyword score outside the {self.cascade_band[0]:g}-{self.cascade_band[1]:g} review band: "
+                f"{counts['buying_signals']} buying signals, {counts['interest']} interest and "
+                f"{counts['objection']} objection phrases, {'positive' if positive else 'neutral or negative'} sentiment"
+            ),
+            "priority_level": "High" if hot else "Low",
+            "recommended_action": "Send proposal and book a demo" if hot else "Add to nurture sequence",
+            "timeline": "Immediate" if hot else "Next Quarter",
+            "confidence_level": "Medium"
+        }
+        
+        if hot:
+            coaching = [{
+                "priority": "High",
+                "category": "Closing",
+                "action": "Schedule a demo or send a proposal",
+                "reason": "Strong buying signals and a high keyword score",
+                "script": "Based on what you've shared, the next step would be a tailored demo for your team...",
+                "timeline": "Within 24 hours",
+                "expected_outcome": "Move to proposal stage"
+            }]
+        else:
+            coaching = [{
+                "priority": "Low",
+                "category": "Nurture",
+                "action": "Add to a nurture campaign",
+                "reason": "Few buying signals and a low keyword score",
+                "script": "I'll share a few resources that might be useful as you evaluate your options...",
+                "timeline": "Within 1 week",
+                "expected_outcome": "Keep the lead warm until intent increases"
+            }]
+        if counts['objection'] > 2:
+            coaching.append({
+                "priority": "Medium",
+                "category": "Objection Handling",
+                "action": "Address the objections raised",
+                "reason": f"{counts['objection']} objection phrases in the conversation",
+                "script": "I understand your concerns. Let me share how other clients handled this...",
+                "timeline": "Next conversation",
+                "expected_outcome": "Reduced resistance"
+            })
+        
+        return {
+            'analysis': analysis,
+            'score': score_data,
+            'insights': local['insights'] or ["📊 Keyword analysis completed"],
+            'coaching': coaching
+        }
+    
+    def score_many(self, conversations: Iterable[str], concurrency: int = LLM_BATCH_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+        """Analyze and score many conversations with a bounded worker pool.
+        
+        Conversations are read lazily, with at most twice `concurrency` in
+        flight. Results are yielded in completion order as dicts holding the
+        input `index`, `analysis`, `score`, any `warnings`, the `seconds` it
+        took, and an `error` message when that conversation failed (the rest
+        of the batch continues).
+        """
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-batch")
+        pending = set()
+        try:
+            for index, conversation in enumerate(conversations):
+                if len(pending) >= concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(self._score_one, index, conversation))
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # Stop queued work if the caller abandons the generator early
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _score_one(self, index: int, conversation: str) -> Dict[str, Any]:
+        """Analyze and score one conversation for score_many, capturing any failure"""
+        warnings = []
+        result = {'index': index, 'analysis': None, 'score': None, 'warnings': warnings, 'error': None}
+        self._local.warnings = warnings
+        start = time.perf_counter()
+        try:
+            result['analysis'] = self.analyze_conversation_llm(conversation)
+            result['score'] = self.generate_lead_score_llm(result['analysis'])
+        except Exception as e:
+            result['error'] = str(e)
+        finally:
+            self._local.warnings = None
+            result['seconds'] = time.perf_counter() - start
+        return result
+    
+    def _render_prompt(self, template: str, task: str, conversation: Optional[str] = None, **fields) -> str:
+        """Render a prompt within the task's token budget, warning when the transcript or JSON had to be trimmed"""
+        prompt, omitted, shortened = render_prompt(template, task, conversation, **fields)
+        if omitted:
+            self._show_warning(
+                f"Conversation is longer than the {task.replace('_', ' ')} input budget; "
+                f"{omitted} turns from the middle were shortened or left out of the prompt."
+            )
+        if shortened:
+            self._show_warning(
+                f"The {' and '.join(shortened)} passed to {task.replace('_', ' ')} exceeded its input budget "
+                f"and was shortened in the prompt."
+            )
+        return prompt
+    
+    def generate_full_report_llm(self, conversation: str, timing_context: dict = None) -> Dict[str, Any]:
+        """Use one LLM completion for analysis, scoring, insights and coaching.
+        
+        Returns the same shape as run_analysis_pipeline. Sections missing from
+        the report use their fallbacks; an unparseable report falls back to the
+        staged pipeline.
+        """
+        
+        if not self.api_key_available or not self.client:
+            return self.run_analysis_pipeline(conversation, timing_context, mode='staged')
+        
+        prompt = self._render_prompt(
+            FULL_REPORT_TEMPLATE, 'full_report', conversation,
+            timing_info=build_timing_info(timing_context)
+        )
+        
+        try:
+            report = self._complete('full_report', prompt, FULL_REPORT_SCHEMA, max_tokens=FULL_REPORT_MAX_TOKENS)
+            if not isinstance(report, dict):
+                self._show_warning("LLM full report could not be parsed. Using staged analysis.")
+                return self.run_analysis_pipeline(conversation, timing_context, mode='staged')
+            
+            return self._split_full_report(report, conversation, timing_context)
+                
+        except CircuitOpenError:
+            return self.run_analysis_pipeline(conversation, timing_context, mode='staged')
+        except Exception as e:
+            self._show_warning(f"LLM full report failed: {str(e)}. Using staged analysis.")
+            return self.run_analysis_pipeline(conversation, timing_context, mode='staged')
+    
+    def _split_full_report(self, report: Dict[str, Any], conversation: str, timing_context: dict = None) -> Dict[str, Any]:
+        """Split a full report into the per-stage result shapes, filling gaps with fallbacks"""
+        analysis = report.get('analysis')
+        if not matches_schema(analysis, ANALYSIS_SCHEMA):
+            analysis = self._fallback_analysis(conversation, timing_context)
+        
+        score = report.get('score')
+        if not matches_schema(score, SCORE_SCHEMA):
+            score = self._fallback_scoring(analysis)
+        
+        insights = report.get('insights')
+        if not matches_schema(insights, INSIGHTS_SCHEMA):
+            insights = self._fallback_insights(analysis)
+        
+        coaching = report.get('coaching')
+        if not matches_schema(coaching, COACHING_SCHEMA):
+            coaching = self._fallback_coaching(analysis, score)
+        
+        return {
+            'analysis': analysis,
+            'score': score,
+            'insights': insights,
+            'coaching': coaching
+        }
+    
     def analyze_conversation_llm(self, conversation: str, timing_context: dict = None) -> Dict[str, Any]:
         """Use LLM to analyze sales conversation with advanced insights and timing context"""
         
         if not self.api_key_available or not self.client:
             return self._fallback_analysis(conversation, timing_context)
         
-        # Build timing context string
-        timing_info = ""
-        if timing_context:
-            timing_info = f"""
-            CONVERSATION TIMING:
-            - Date: {timing_context.get('date', 'Not specified')}
-            - Time: {timing_context.get('time', 'Not specified')}
-            - Duration: {timing_context.get('duration', 'Not specified')}
-            - Day of Week: {timing_context.get('day_of_week', 'Not specified')}
-            - Time Since: {timing_context.get('time_since', 'Not specified')}
-            
-            """
-        
-        prompt = f"""
-        Analyze this sales conversation and provide detailed insights:
-
-        {timing_info}
-        CONVERSATION:
-        {conversation}
-
-        Please provide a JSON response with the following structure:
-        {{
-            "sentiment_score": float (-1 to 1),
-            "engagement_level": "Low/Medium/High",
-            "buying_intent": "Low/Medium/High",
-            "key_topics": ["topic1", "topic2", "topic3"],
-            "pain_points": ["pain1", "pain2"],
-            "objections": ["objection1", "objection2"],
-            "buying_signals": ["signal1", "signal2"],
-            "decision_maker_indicators": ["indicator1", "indicator2"],
-            "urgency_level": "Low/Medium/High",
-            "budget_mentions": "Yes/No",
-            "timeline_mentions": "Yes/No",
-            "competitor_mentions": "Yes/No",
-            "next_steps_suggested": ["step1", "step2"],
-            "risk_factors": ["risk1", "risk2"],
-            "opportunity_size": "Small/Medium/Large",
-            "lead_quality": "Poor/Fair/Good/Excellent",
-            "timing_insights": ["timing_insight1", "timing_insight2"],
-            "optimal_follow_up_time": "Immediate/Within 24h/Within 48h/This week/Next week"
-        }}
-
-        Focus on sales-specific insights and actionable recommendations. Consider the timing context when available.
-        """
+        prompt = self._render_prompt(
+            ANALYSIS_TEMPLATE, 'conversation_analysis', conversation,
+            timing_info=build_timing_info(timing_context)
+        )
         
         try:
             # Use the correct API method
-            response = together.Complete.create(
-                model=MODELS['conversation_analysis'],
-                prompt=prompt,
-                max_tokens=DEFAULT_MODEL_PARAMS['max_tokens'],
-                temperature=DEFAULT_MODEL_PARAMS['temperature'],
-                top_p=DEFAULT_MODEL_PARAMS['top_p'],
-                top_k=DEFAULT_MODEL_PARAMS['top_k']
-            )
-            
-            # Extract text from response - fixed structure
-            result_text = response['choices'][0]['text']
-            # Clean the response and extract JSON - improved extraction
-            json_start = result_text.find('{')
-            json_end = result_text.rfind('}') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = result_text[json_start:json_end]
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    # Try to find valid JSON by looking for the last complete JSON object
-                    import re
-                    json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-                    matches = re.findall(json_pattern, result_text)
-                    if matches:
-                        try:
-                            return json.loads(matches[-1])  # Use the last complete JSON object
-                        except json.JSONDecodeError:
-                            pass
+            result = self._complete('conversation_analysis', prompt, ANALYSIS_SCHEMA)
+            if result is not None:
+                return result
             return self._fallback_analysis(conversation, timing_context)
                 
+        except CircuitOpenError:
+            return self._fallback_analysis(conversation, timing_context)
         except Exception as e:
             self._show_warning(f"LLM analysis failed: {str(e)}. Using fallback analysis.")
             return self._fallback_analysis(conversation, timing_context)
@@ -124,62 +489,16 @@ class LLMService:
         if not self.api_key_available or not self.client:
             return self._fallback_scoring(analysis)
         
-        analysis_str = json.dumps(analysis, indent=2)
-        
-        prompt = f"""
-        Based on this conversation analysis, calculate a comprehensive lead score:
-
-        ANALYSIS:
-        {analysis_str}
-
-        Please provide a JSON response with:
-        {{
-            "overall_score": int (0-100),
-            "score_breakdown": {{
-                "buying_intent": int (0-25),
-                "decision_power": int (0-20),
-                "urgency": int (0-15),
-                "budget_availability": int (0-15),
-                "fit_score": int (0-15),
-                "engagement": int (0-10)
-            }},
-            "score_explanation": "Detailed explanation of the score",
-            "priority_level": "Low/Medium/High/Critical",
-            "recommended_action": "Specific next action to take",
-            "timeline": "Immediate/This Week/This Month/Long-term",
-            "confidence_level": "Low/Medium/High"
-        }}
-        """
+        prompt = self._render_prompt(LEAD_SCORE_TEMPLATE, 'lead_scoring', analysis=analysis)
         
         try:
-            response = together.Complete.create(
-                model=MODELS['lead_scoring'],
-                prompt=prompt,
-                max_tokens=DEFAULT_MODEL_PARAMS['max_tokens'],
-                temperature=DEFAULT_MODEL_PARAMS['temperature'],
-                top_p=DEFAULT_MODEL_PARAMS['top_p'],
-                top_k=DEFAULT_MODEL_PARAMS['top_k']
-            )
-            
-            result_text = response['choices'][0]['text']
-            json_start = result_text.find('{')
-            json_end = result_text.rfind('}') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = result_text[json_start:json_end]
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    # Try to find valid JSON by looking for the last complete JSON object
-                    import re
-                    json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-                    matches = re.findall(json_pattern, result_text)
-                    if matches:
-                        try:
-                            return json.loads(matches[-1])  # Use the last complete JSON object
-                        except json.JSONDecodeError:
-                            pass
+            result = self._complete('lead_scoring', prompt, SCORE_SCHEMA)
+            if result is not None:
+                return result
             return self._fallback_scoring(analysis)
                 
+        except CircuitOpenError:
+            return self._fallback_scoring(analysis)
         except Exception as e:
             self._show_warning(f"LLM scoring failed: {str(e)}. Using fallback scoring.")
             return self._fallback_scoring(analysis)
@@ -190,63 +509,19 @@ class LLMService:
         if not self.api_key_available or not self.client:
             return self._fallback_coaching(analysis, score_data)
         
-        analysis_str = json.dumps(analysis, indent=2)
-        score_str = json.dumps(score_data, indent=2)
-        
-        prompt = f"""
-        Generate personalized coaching recommendations for this sales situation:
-
-        CONVERSATION ANALYSIS:
-        {analysis_str}
-
-        LEAD SCORE DATA:
-        {score_str}
-
-        Provide a JSON array of coaching recommendations:
-        [
-            {{
-                "priority": "High/Medium/Low",
-                "category": "Objection Handling/Discovery/Closing/Follow-up",
-                "action": "Specific action to take",
-                "reason": "Why this action is recommended",
-                "script": "Sample script or approach",
-                "timeline": "When to implement",
-                "expected_outcome": "What this should achieve"
-            }}
-        ]
-
-        Focus on actionable, specific advice tailored to this situation.
-        """
+        prompt = self._render_prompt(
+            COACHING_TEMPLATE, 'coaching',
+            analysis=analysis, score=score_data
+        )
         
         try:
-            response = together.Complete.create(
-                model=MODELS['coaching'],
-                prompt=prompt,
-                max_tokens=DEFAULT_MODEL_PARAMS['max_tokens'],
-                temperature=DEFAULT_MODEL_PARAMS['temperature'],
-                top_p=DEFAULT_MODEL_PARAMS['top_p'],
-                top_k=DEFAULT_MODEL_PARAMS['top_k']
-            )
-            
-            result_text = response['choices'][0]['text']
-            json_start = result_text.find('[')
-            json_end = result_text.rfind(']') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = result_text[json_start:json_end]
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    # Try to find valid JSON array by looking for the last complete array
-                    import re
-                    array_pattern = r'\[[^\[\]]*(?:\{[^{}]*\}[^\[\]]*)*\]'
-                    matches = re.findall(array_pattern, result_text)
-                    if matches:
-                        try:
-                            return json.loads(matches[-1])  # Use the last complete array
-                        except json.JSONDecodeError:
-                            pass
+            result = self._complete('coaching', prompt, COACHING_SCHEMA)
+            if result is not None:
+                return result
             return self._fallback_coaching(analysis, score_data)
                 
+        except CircuitOpenError:
+            return self._fallback_coaching(analysis, score_data)
         except Exception as e:
             self._show_warning(f"LLM coaching failed: {str(e)}. Using fallback coaching.")
             return self._fallback_coaching(analysis, score_data)
@@ -257,109 +532,117 @@ class LLMService:
         if not self.api_key_available or not self.client:
             return self._fallback_insights(analysis)
         
-        analysis_str = json.dumps(analysis, indent=2)
-        
-        prompt = f"""
-        Generate advanced insights from this sales conversation:
-
-        CONVERSATION:
-        {conversation}
-
-        ANALYSIS:
-        {analysis_str}
-
-        Provide a JSON array of insights:
-        [
-            "Insight 1 with emoji",
-            "Insight 2 with emoji",
-            "Insight 3 with emoji"
-        ]
-
-        Focus on:
-        - Hidden opportunities
-        - Potential risks
-        - Strategic recommendations
-        - Behavioral patterns
-        - Competitive advantages
-        """
+        prompt = self._render_prompt(INSIGHTS_TEMPLATE, 'insights', conversation, analysis=analysis)
         
         try:
-            response = together.Complete.create(
-                model=MODELS['insights'],
-                prompt=prompt,
-                max_tokens=DEFAULT_MODEL_PARAMS['max_tokens'],
-                temperature=DEFAULT_MODEL_PARAMS['temperature'],
-                top_p=DEFAULT_MODEL_PARAMS['top_p'],
-                top_k=DEFAULT_MODEL_PARAMS['top_k']
-            )
-            
-            result_text = response['choices'][0]['text']
-            json_start = result_text.find('[')
-            json_end = result_text.rfind(']') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = result_text[json_start:json_end]
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    # Try to find valid JSON array by looking for the last complete array
-                    import re
-                    array_pattern = r'\[[^\[\]]*(?:\{[^{}]*\}[^\[\]]*)*\]'
-                    matches = re.findall(array_pattern, result_text)
-                    if matches:
-                        try:
-                            return json.loads(matches[-1])  # Use the last complete array
-                        except json.JSONDecodeError:
-                            pass
+            result = self._complete('insights', prompt, INSIGHTS_SCHEMA)
+            if result is not None:
+                return result
             return self._fallback_insights(analysis)
                 
+        except CircuitOpenError:
+            return self._fallback_insights(analysis)
         except Exception as e:
             self._show_warning(f"LLM insights failed: {str(e)}. Using fallback insights.")
             return self._fallback_insights(analysis)
     
+    def _build_follow_up_email_prompt(self, conversation: str, analysis: Dict[str, Any]) -> str:
+        """Build the follow-up email prompt shared by the blocking and streaming variants"""
+        return self._render_prompt(FOLLOW_UP_EMAIL_TEMPLATE, 'follow_up_email', conversation, analysis=analysis)
+    
     def generate_follow_up_email_llm(self, conversation: str, analysis: Dict[str, Any]) -> str:
         """Use LLM to generate personalized follow-up emails"""
         
         if not self.api_key_available or not self.client:
             return self._fallback_email(analysis)
         
-        analysis_str = json.dumps(analysis, indent=2)
+        prompt = self._build_follow_up_email_prompt(conversation, analysis)
         
-        prompt = f"""
-        Generate a personalized follow-up email based on this sales conversation:
-
-        CONVERSATION:
-        {conversation}
-
-        ANALYSIS:
-        {analysis_str}
-
-        Create a professional, personalized follow-up email that:
-        - References specific points from the conversation
-        - Addresses any concerns or objections
-        - Provides value and next steps
-        - Is appropriate for the lead's stage and interest level
-
-        Return only the email content, no JSON formatting.
+        try:
+            return self._complete('follow_up_email', prompt).strip()
+                
+        except CircuitOpenError:
+            return self._fallback_email(analysis)
+        except Exception as e:
+            self._show_warning(f"LLM email generation failed: {str(e)}. Using fallback email.")
+            return self._fallback_email(analysis)
+    
+    def stream_follow_up_email_llm(self, conversation: str, analysis: Dict[str, Any]) -> Iterator[str]:
+        """Yield a personalized follow-up email as text chunks while it is generated.
+        
+        Closing the generator early stops the generation. Cached emails are
+        yielded in one chunk; if the stream fails before producing any text the
+        fallback email is yielded instead.
         """
         
+        if not self.api_key_available or not self.client:
+            yield self._fallback_email(analysis)
+            return
+        
+        task = 'follow_up_email'
+        prompt = self._build_follow_up_email_prompt(conversation, analysis)
+        model = MODELS[task]
+        params = dict(DEFAULT_MODEL_PARAMS)
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(model, params, prompt)
+            cached_text = self.cache.get(cache_key)
+            if cached_text:
+                self.metrics.increment(task, 'cache_hits')
+                yield cached_text.strip()
+                return
+            self.metrics.increment(task, 'cache_misses')
+        
+        permit = self.circuit_breaker.allow_request()
+        if permit is None:
+            self.metrics.increment(task, 'circuit_open')
+            yield self._fallback_email(analysis)
+            return
+        
+        # Streams are not retried: a retry after partial output would repeat text
+        self.metrics.increment(task, 'requests')
+        start = time.perf_counter()
+        chunks = []
+        stream = None
         try:
-            response = together.Complete.create(
-                model=MODELS['coaching'],
-                prompt=prompt,
-                max_tokens=DEFAULT_MODEL_PARAMS['max_tokens'],
-                temperature=DEFAULT_MODEL_PARAMS['temperature'],
-                top_p=DEFAULT_MODEL_PARAMS['top_p'],
-                top_k=DEFAULT_MODEL_PARAMS['top_k']
-            )
+            stream = self.client.stream(model, prompt, params)
+            for chunk in stream:
+                if not chunks:
+                    chunk = chunk.lstrip()
+                chunks.append(chunk)
+                yield chunk
             
-            return response['choices'][0]['text'].strip()
+            self.circuit_breaker.record_success()
+            self.metrics.observe_latency(task, time.perf_counter() - start)
+            self.metrics.increment(task, 'prompt_tokens', estimate_tokens(prompt))
+            self.metrics.increment(task, 'completion_tokens', estimate_tokens(''.join(chunks)))
+            if cache_key is not None and chunks:
+                self.cache.set(cache_key, ''.join(chunks))
                 
         except Exception as e:
-            self._show_warning(f"LLM email generation failed: {str(e)}. Using fallback email.")
-            return self._fallback_email(analysis)
+            self.metrics.increment(task, 'errors')
+            if is_transient_error(e):
+                self.circuit_breaker.record_failure()
+            if chunks:
+                self._show_warning(f"LLM email generation was interrupted: {str(e)}.")
+            else:
+                self._show_warning(f"LLM email generation failed: {str(e)}. Using fallback email.")
+                yield self._fallback_email(analysis)
+        finally:
+            # Stop the upstream request when the caller cancels, and free the half-open probe
+            # if this stream was it and ended without an outcome (abandoned, or a non-transient error)
+            if stream is not None:
+                stream.close()
+            self.circuit_breaker.release_probe(permit)
     
     def _fallback_analysis(self, conversation: str, timing_context: dict = None) -> Dict[str, Any]:
         """Fallback analysis when LLM fails"""
+        self.metrics.increment('conversation_analysis', 'fallbacks')
+        return self._default_analysis(timing_context)
+    
+    def _default_analysis(self, timing_context: dict = None) -> Dict[str, Any]:
+        """Neutral analysis fields plus rule-based timing insights"""
         base_analysis = {
             "sentiment_score": 0.0,
             "engagement_level": "Medium",
@@ -416,6 +699,7 @@ class LLMService:
     
     def _fallback_scoring(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Fallback scoring when LLM fails"""
+        self.metrics.increment('lead_scoring', 'fallbacks')
         return {
             "overall_score": 50,
             "score_breakdown": {
@@ -435,6 +719,7 @@ class LLMService:
     
     def _fallback_coaching(self, analysis: Dict[str, Any], score_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Fallback coaching when LLM fails"""
+        self.metrics.increment('coaching', 'fallbacks')
         return [
             {
                 "priority": "Medium",
@@ -449,6 +734,7 @@ class LLMService:
     
     def _fallback_insights(self, analysis: Dict[str, Any]) -> List[str]:
         """Fallback insights when LLM fails"""
+        self.metrics.increment('insights', 'fallbacks')
         return [
             "📊 Standard analysis completed",
             "💡 Consider scheduling follow-up",
@@ -457,6 +743,7 @@ class LLMService:
     
     def _fallback_email(self, analysis: Dict[str, Any]) -> str:
         """Fallback email when LLM fails"""
+        self.metrics.increment('follow_up_email', 'fallbacks')
         return """
         Dear [Prospect Name],
 
@@ -0,0 +1,386 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from config import PROMPT_TOKEN_BUDGETS
+from transcript import estimate_tokens, format_turn, parse_transcript
+
+# Prompt templates for each LLM task. They are stored without leading
+# indentation and filled with str.format, so literal braces are doubled.
+
+FULL_REPORT_TEMPLATE = """\
+Analyze this sales conversation, score the lead, and coach the sales rep in a single report:
+
+{timing_info}
+CONVERSATION:
+{conversation}
+
+Please provide one JSON object with exactly these four sections:
+{{
+    "analysis": {{
+        "sentiment_score": float (-1 to 1),
+        "engagement_level": "Low/Medium/High",
+        "buying_intent": "Low/Medium/High",
+        "key_topics": ["topic1", "topic2", "topic3"],
+        "pain_points": ["pain1", "pain2"],
+        "objections": ["objection1", "objection2"],
+        "buying_signals": ["signal1", "signal2"],
+        "decision_maker_indicators": ["indicator1", "indicator2"],
+        "urgency_level": "Low/Medium/High",
+        "budget_mentions": "Yes/No",
+        "timeline_mentions": "Yes/No",
+        "competitor_mentions": "Yes/No",
+        "next_steps_suggested": ["step1", "step2"],
+        "risk_factors": ["risk1", "risk2"],
+        "opportunity_size": "Small/Medium/Large",
+        "lead_quality": "Poor/Fair/Good/Excellent",
+        "timing_insights": ["timing_insight1", "timing_insight2"],
+        "optimal_follow_up_time": "Immediate/Within 24h/Within 48h/This week/Next week"
+    }},
+    "score": {{
+        "overall_score": int (0-100),
+        "score_breakdown": {{
+            "buying_intent": int (0-25),
+            "decision_power": int (0-20),
+            "urgency": int (0-15),
+            "budget_availability": int (0-15),
+            "fit_score": int (0-15),
+            "engagement": int (0-10)
+        }},
+        "score_explanation": "Detailed explanation of the score",
+        "priority_level": "Low/Medium/High/Critical",
+        "recommended_action": "Specific next action to take",
+        "timeline": "Immediate/This Week/This Month/Long-term",
+        "confidence_level": "Low/Medium/High"
+    }},
+    "insights": [
+        "Insight 1 with emoji",
+        "Insight 2 with emoji",
+        "Insight 3 with emoji"
+    ],
+    "coaching": [
+        {{
+            "priority": "High/Medium/Low",
+            "category": "Objection Handling/Discovery/Closing/Follow-up",
+            "action": "Specific action to take",
+            "reason": "Why this action is recommended",
+            "script": "Sample script or approach",
+            "timeline": "When to implement",
+            "expected_outcome": "What this should achieve"
+        }}
+    ]
+}}
+
+Base the score, insights and coaching on your analysis. Insights should cover hidden opportunities,
+potential risks, strategic recommendations, behavioral patterns and competitive advantages.
+Coaching should be actionable, specific advice tailored to this situation. Consider the timing context when available.
+"""
+
+ANALYSIS_TEMPLATE = """\
+Analyze this sales conversation and provide detailed insights:
+
+{timing_info}
+CONVERSATION:
+{conversation}
+
+Please provide a JSON response with the following structure:
+{{
+    "sentiment_score": float (-1 to 1),
+    "engagement_level": "Low/Medium/High",
+    "buying_intent": "Low/Medium/High",
+    "key_topics": ["topic1", "topic2", "topic3"],
+    "pain_points": ["pain1", "pain2"],
+    "objections": ["objection1", "objection2"],
+    "buying_signals": ["signal1", "signal2"],
+    "decision_maker_indicators": ["indicator1", "indicator2"],
+    "urgency_level": "Low/Medium/High",
+    "budget_mentions": "Yes/No",
+    "timeline_mentions": "Yes/No",
+    "competitor_mentions": "Yes/No",
+    "next_steps_suggested": ["step1", "step2"],
+    "risk_factors": ["risk1", "risk2"],
+    "opportunity_size": "Small/Medium/Large",
+    "lead_quality": "Poor/Fair/Good/Excellent",
+    "timing_insights": ["timing_insight1", "timing_insight2"],
+    "optimal_follow_up_time": "Immediate/Within 24h/Within 48h/This week/Next week"
+}}
+
+Focus on sales-specific insights and actionable recommendations. Consider the timing context when available.
+"""
+
+LEAD_SCORE_TEMPLATE = """\
+Based on this conversation analysis, calculate a comprehensive lead score:
+
+ANALYSIS:
+{analysis}
+
+Please provide a JSON response with:
+{{
+    "overall_score": int (0-100),
+    "score_breakdown": {{
+        "buying_intent": int (0-25),
+        "decision_power": int (0-20),
+        "urgency": int (0-15),
+        "budget_availability": int (0-15),
+        "fit_score": int (0-15),
+        "engagement": int (0-10)
+    }},
+    "score_explanation": "Detailed explanation of the score",
+    "priority_level": "Low/Medium/High/Critical",
+    "recommended_action": "Specific next action to take",
+    "timeline": "Immediate/This Week/This Month/Long-term",
+    "confidence_level": "Low/Medium/High"
+}}
+"""
+
+COACHING_TEMPLATE = """\
+Generate personalized coaching recommendations for this sales situation:
+
+CONVERSATION ANALYSIS:
+{analysis}
+
+LEAD SCORE DATA:
+{score}
+
+Provide a JSON array of coaching recommendations:
+[
+    {{
+        "priority": "High/Medium/Low",
+        "category": "Objection Handling/Discovery/Closing/Follow-up",
+        "action": "Specific action to take",
+        "reason": "Why this action is recommended",
+        "script": "Sample script or approach",
+        "timeline": "When to implement",
+        "expected_outcome": "What this should achieve"
+    }}
+]
+
+Focus on actionable, specific advice tailored to this situation.
+"""
+
+INSIGHTS_TEMPLATE = """\
+Generate advanced insights from this sales conversation:
+
+CONVERSATION:
+{conversation}
+
+ANALYSIS:
+{analysis}
+
+Provide a JSON array of insights:
+[
+    "Insight 1 with emoji",
+    "Insight 2 with emoji",
+    "Insight 3 with emoji"
+]
+
+Focus on:
+- Hidden opportunities
+- Potential risks
+- Strategic recommendations
+- Behavioral patterns
+- Competitive advantages
+"""
+
+FOLLOW_UP_EMAIL_TEMPLATE = """\
+Generate a personalized follow-up email based on this sales conversation:
+
+CONVERSATION:
+{conversation}
+
+ANALYSIS:
+{analysis}
+
+Create a professional, personalized follow-up email that:
+- References specific points from the conversation
+- Addresses any concerns or objections
+- Provides value and next steps
+- Is appropriate for the lead's stage and interest level
+
+Return only the email content, no JSON formatting.
+"""
+
+TIMING_TEMPLATE = """\
+CONVERSATION TIMING:
+- Date: {date}
+- Time: {time}
+- Duration: {duration}
+- Day of Week: {day_of_week}
+- Time Since: {time_since}
+"""
+
+def compact_json(value: Any) -> str:
+    """Serialize a value for a prompt without indentation or padding"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def _shorten(value: Any, max_items: int, max_chars: int) -> Any:
+    """Copy of a JSON value with lists cut to max_items and strings to max_chars"""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + '…'
+    if isinstance(value, list):
+        return [_shorten(item, max_items, max_chars) for item in value[:max_items]]
+    if isinstance(value, dict):
+        return {key: _shorten(item, max_items, max_chars) for key, item in value.items()}
+    return value
+
+def _largest(value: Any) -> Tuple[int, int]:
+    """Longest list and longest string anywhere in a JSON value"""
+    if isinstance(value, str):
+        return 0, len(value)
+    children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+    items, chars = len(value) if isinstance(value, list) else 0, 0
+    for child in children:
+        child_items, child_chars = _largest(child)
+        items, chars = max(items, child_items), max(chars, child_chars)
+    return items, chars
+
+def fit_json(value: Any, max_tokens: int) -> Tuple[str, bool]:
+    """Serialize a value compactly, shortening it to fit max_tokens.
+    
+    The longest lists and strings are cut down step by step, and as a last resort
+    the last keys of an object are dropped, so the result stays valid JSON.
+    Returns the text and whether anything was left out.
+    """
+    text = compact_json(value)
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+    largest_items, largest_chars = _largest(value)
+    max_items, max_chars = max(largest_items * 3 // 4, 1), max(largest_chars * 3 // 4, 16)
+    while True:
+        shortened = _shorten(value, max_items, max_chars)
+        text = compact_json(shortened)
+        if estimate_tokens(text) <= max_tokens or (max_items == 1 and max_chars == 16):
+            break
+        max_items, max_chars = max(max_items * 3 // 4, 1), max(max_chars * 3 // 4, 16)
+    if isinstance(shortened, dict):
+        keys = list(shortened)
+        while keys and estimate_tokens(text) > max_tokens:
+            keys.pop()
+            text = compact_json({key: shortened[key] for key in keys})
+    return text, True
+
+@lru_cache(maxsize=64)
+def _label_tokens(speaker: str) -> int:
+    """Tokens a "Speaker: " prefix and the line break add to a turn"""
+    return estimate_tokens(f"{speaker}:") + 1 if speaker else 1
+
+def _clip_words(text: str, max_tokens: int, from_end: bool = False) -> str:
+    """The most whole words from the start (or end) of text that fit max_tokens"""
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        count = (low + high + 1) // 2
+        kept = words[-count:] if from_end else words[:count]
+        if estimate_tokens(' '.join(kept)) <= max_tokens:
+            low = count
+        else:
+            high = count - 1
+    if not low:
+        return ''
+    return ' '.join(words[-low:] if from_end else words[:low])
+
+def fit_transcript(conversation: str, max_tokens: int) -> Tuple[str, int]:
+    """Render a transcript one turn per line, omitting text from the middle to fit max_tokens.
+    
+    The opening (context, introductions) and the end (next steps) of a call
+    matter most, so about a third of the budget goes to the first turns and
+    the rest to the last turns. Budget those whole turns leave is spent on
+    the start and end of the turns beside the gap, so one long turn (or a
+    transcript with no speaker labels) keeps its beginning and end. Token
+    counts come from the parsed turns, so the transcript is not re-tokenized.
+    Returns the text and the number of turns shortened or omitted.
+    """
+    turns = parse_transcript(conversation)
+    lines = [format_turn(turn) for turn in turns]
+    line_tokens = [turn.tokens + _label_tokens(turn.speaker) for turn in turns]
+    if sum(line_tokens) <= max_tokens:
+        return '\n'.join(lines), 0
+    
+    # Room for the omission marker is set aside first
+    marker_tokens = estimate_tokens(f"[... {len(turns)} turns omitted to fit the input budget ...]") + 1
+    max_tokens -= marker_tokens
+    head_budget = max_tokens // 3
+    head_end = 0
+    used = 0
+    while head_end < len(lines) and used + line_tokens[head_end] <= head_budget:
+        used += line_tokens[head_end]
+        head_end += 1
+    
+    tail_start = len(lines)
+    while tail_start > head_end and used + line_tokens[tail_start - 1] <= max_tokens:
+        tail_start -= 1
+        used += line_tokens[tail_start]
+    
+    omitted = tail_start - head_end
+    first, last = turns[head_end], turns[tail_start - 1]
+    # Whatever is left goes to the start of the first omitted turn and the end of the last one
+    spare = max_tokens - used - _label_tokens(first.speaker)
+    if omitted > 1:
+        spare -= _label_tokens(last.speaker)
+    head_text = _clip_words(first.text, spare // 2)
+    tail_text = _clip_words(last.text, spare - estimate_tokens(head_text), from_end=True)
+    shortened = bool(head_text or tail_text) if omitted == 1 else bool(head_text) + bool(tail_text)
+    dropped = omitted - shortened
+    marker = (f"[... {dropped} turns omitted to fit the input budget ...]" if dropped
+              else "[... omitted to fit the input budget ...]")
+    
+    def labelled(speaker, text):
+        return f"{speaker}: {text}" if speaker else text
+    
+    if omitted == 1:
+        middle = [labelled(first.speaker, ' '.join(part for part in (head_text, marker, tail_text) if part))]
+    else:
+        middle = [labelled(first.speaker, head_text)] if head_text else []
+        middle.append(marker)
+        if tail_text:
+            middle.append(labelled(last.speaker, tail_text))
+    return '\n'.join(lines[:head_end] + middle + lines[tail_start:]), omitted
+
+def build_timing_info(timing_context: Optional[Dict[str, Any]] = None) -> str:
+    """Format the conversation timing context for a prompt"""
+    if not timing_context:
+        return ""
+    return TIMING_TEMPLATE.format(**{
+        field: timing_context.get(field, 'Not specified')
+        for field in ('date', 'time', 'duration', 'day_of_week', 'time_since')
+    })
+
+def render_prompt(template: str, task: str, conversation: Optional[str] = None,
+                  **fields) -> Tuple[str, int, Tuple[str, ...]]:
+    """Fill a template so the whole prompt fits the task's input token budget.
+    
+    String fields are used as given. Other fields (an analysis, a score) are
+    embedded as compact JSON, shortened with fit_json when they do not fit:
+    they share what the template leaves, or half of it when there is also a
+    conversation, which then gets the rest. Returns the prompt, how many
+    transcript turns were omitted, and the names of shortened JSON fields.
+    """
+    budget = PROMPT_TOKEN_BUDGETS[task]
+    structured = [name for name, value in fields.items() if not isinstance(value, str)]
+    blank = {name: '' for name in structured}
+    if conversation is not None:
+        blank['conversation'] = ''
+    available = max(budget - estimate_tokens(template.format(**{**fields, **blank})), 0)
+    
+    shortened = []
+    json_budget = available // 2 if conversation is not None else available
+    # Smallest first, so what a small field does not use is left to the larger ones
+    for position, name in enumerate(sorted(structured, key=lambda name: len(compact_json(fields[name])))):
+        fields[name], cut = fit_json(fields[name], json_budget // (len(structured) - position))
+        json_budget -= estimate_tokens(fields[name])
+        available -= estimate_tokens(fields[name])
+        if cut:
+            shortened.append(name)
+    
+    omitted = 0
+    transcript_budget = max(available, 0)
+    while True:
+        if conversation is not None:
+            fields['conversation'], omitted = fit_transcript(conversation, transcript_budget)
+        # Empty optional sections (e.g. no timing info) leave runs of blank lines
+        prompt = re.sub(r'\n{3,}', '\n\n', template.format(**fields)).strip()
+        # Estimates of the parts need not add up exactly; take any overshoot off the transcript
+        overshoot = estimate_tokens(prompt) - budget
+        if overshoot <= 0 or conversation is None or transcript_budget == 0:
+            return prompt, omitted, tuple(shortened)
+        transcript_budget = max(transcript_budget - overshoot, 0)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Batch lead scoring from the command line
+
+Score every transcript in a CSV or JSONL file with LeadAnalyzer across a
+process pool, optionally adding LLM scores, and write one result row per
+transcript as it goes:
+    python score_conversations.py calls.csv scores.jsonl
+    python score_conversations.py calls.jsonl scores.csv --workers 8 --llm
+    python score_conversations.py calls.jsonl scores.csv --llm --cascade
+    python score_conversations.py calls.csv scores.jsonl --resume
+
+The input is streamed with only a few chunks in flight, so memory stays flat
+whatever the file size. Results are written in input order, so an interrupted
+run resumes by skipping as many input records as the output already holds;
+a CSV output is only resumed by a run that writes the same columns.
+With --cascade only transcripts whose keyword score falls inside the
+uncertainty band are sent to the LLM; the rest keep their local score.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+from config import SENTIMENT_ENGINE, LLM_BATCH_CONCURRENCY, CASCADE_UNCERTAINTY_BAND, LEAD_SCORING_MODEL
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# One analyzer per worker process, built by the pool initializer
+_analyzer = None
+
+def _init_worker(sentiment_engine: str, prospect_only: bool, scoring_model: str = None):
+    global _analyzer
+    from lead_analyzer import LeadAnalyzer
+    _analyzer = LeadAnalyzer(sentiment_engine=sentiment_engine, prospect_only=prospect_only, scoring_model=scoring_model)
+
+def _score_chunk(texts: List[str]) -> Tuple[List[Dict[str, Any]], float]:
+    """Score a chunk of transcripts in a worker; returns one plain dict per transcript and the seconds taken"""
+    start = time.perf_counter()
+    frame = _analyzer.analyze_many(texts)
+    rows = [
+        {column: value.item() if hasattr(value, 'item') else value for column, value in row.items()}
+        for row in frame.to_dict('records')
+    ]
+    return rows, time.perf_counter() - start
+
+def file_format(path: str, explicit: str = None) -> str:
+    """Pick csv or jsonl from an explicit choice or the file extension"""
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise SystemExit(f"❌ Cannot tell the format of {path}; pass csv or jsonl explicitly")
+    return FORMATS[extension]
+
+def read_records(f, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield input records one at a time"""
+    if fmt == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def completed_rows(path: str, fmt: str) -> int:
+    """Count the result rows already in an output file, dropping a partly written last row"""
+    if not os.path.exists(path):
+        return 0
+    complete_bytes = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            complete_bytes += len(line)
+    if complete_bytes != os.path.getsize(path):
+        os.truncate(path, complete_bytes)
+
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            # Minus the header row
+            return max(0, sum(1 for _ in csv.reader(f)) - 1)
+        return sum(1 for line in f if line.strip())
+
+class ResultWriter:
+    """Append result rows to a JSONL or CSV file, flushing after every batch.
+    
+    When appending to a CSV that already has a header, rows must have the
+    same columns; otherwise the run stops rather than misalign them.
+    """
+
+    def __init__(self, path: str, fmt: str, append: bool):
+        self.path = path
+        self.fmt = fmt
+        self._header = None
+        if fmt == 'csv' and append and os.path.exists(path) and os.path.getsize(path):
+            with open(path, encoding='utf-8', newline='') as f:
+                self._header = next(csv.reader(f), None)
+        self._needs_header = not (append and os.path.exists(path) and os.path.getsize(path))
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._csv = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self.fmt == 'csv':
+            if self._csv is None:
+                columns = list(rows[0])
+                if self._header is not None and columns != self._header:
+                    raise SystemExit(
+                        f"❌ {self.path} has columns {', '.join(self._header)} but this run writes "
+                        f"{', '.join(columns)}; resume with the options of the original run"
+                    )
+                self._csv = csv.DictWriter(self._file, fieldnames=columns)
+                if self._needs_header:
+                    self._csv.writeheader()
+            self._csv.writerows(rows)
+        else:
+            self._file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class Progress:
+    """Report records scored, throughput and how far through the input file we are"""
+
+    def __init__(self, input_file, interval: float = 0.5):
+        self._input = input_file
+        self._total_bytes = os.fstat(input_file.fileno()).st_size
+        self._interval = interval
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, scored: int, final: bool = False):
+        now = time.perf_counter()
+        if not final and now - self._last < self._interval:
+            return
+        self._last = now
+        rate = scored / max(now - self.start, 1e-9)
+        line = f"\r   {scored:,} scored  {rate:,.1f} records/s"
+        if self._total_bytes and not self._input.closed:
+            line += f"  {min(100.0, 100 * self._input.buffer.tell() / self._total_bytes):.0f}% of input"
+        print(line, end='\n' if final else '', file=sys.stderr, flush=True)
+
+def llm_scores(service, texts: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """Score a chunk with the LLM service; one dict of LLM columns per transcript"""
+    columns = [None] * len(texts)
+    for result in service.score_many(texts, concurrency):
+        score = result['score'] or {}
+        columns[result['index']] = {
+            'llm_score': score.get('overall_score'),
+            'llm_priority': score.get('priority_level'),
+            'llm_error': result['error'],
+            'llm_seconds': result['seconds']
+        }
+    return columns
+
+def cascade_scores(service, texts: List[str], scores: List[Dict[str, Any]], concurrency: int,
+                   local_seconds: float) -> List[Dict[str, Any]]:
+    """LLM columns for a chunk, calling the LLM only for transcripts with ambiguous local scores.
+    
+    Each transcript's latency is recorded against the tier that answered it;
+    the local tier's share of the chunk time counts towards both tiers.
+    """
+    escalate = [i for i, row in enumerate(scores) if service.needs_llm(row['lead_score'])]
+    columns = [{'tier': 'local', 'llm_score': None, 'llm_priority': None, 'llm_error': None} for _ in texts]
+    for i, llm_columns in zip(escalate, llm_scores(service, [texts[i] for i in escalate], concurrency)):
+        seconds = llm_columns.pop('llm_seconds')
+        columns[i] = {'tier': 'llm', **llm_columns}
+        service.metrics.observe_tier('llm', local_seconds + seconds)
+    for column in columns:
+        if column['tier'] == 'local':
+            service.metrics.observe_tier('local', local_seconds)
+    return columns
+
+def main():
+    """Parse arguments and score the input file"""
+    parser = argparse.ArgumentParser(description="Score sales conversations from a CSV or JSONL file")
+    parser.add_argument('input', help="CSV or JSONL file of transcripts")
+    parser.add_argument('output', help="JSONL or CSV file for results")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'])
+    parser.add_argument('--text-column', default='conversation', help="Field holding the transcript")
+    parser.add_argument('--id-column', help="Field to copy into each result row")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=64, help="Transcripts per worker task")
+    parser.add_argument('--sentiment-engine', choices=['textblob', 'lexicon'], default=SENTIMENT_ENGINE)
+    parser.add_argument('--prospect-only', action='store_true', help="Leave the sales rep's turns out of the scores")
+    parser.add_argument('--scoring-model', default=LEAD_SCORING_MODEL,
+                        help="Distilled model (.npz) to score with instead of the keyword formula")
+    parser.add_argument('--llm', action='store_true', help="Also score each transcript with the LLM service")
+    parser.add_argument('--llm-concurrency', type=int, default=LLM_BATCH_CONCURRENCY)
+    parser.add_argument('--cascade', action='store_true',
+                        help="With --llm, only send transcripts with an ambiguous keyword score to the LLM")
+    parser.add_argument('--band', type=float, nargs=2, metavar=('LOW', 'HIGH'), default=CASCADE_UNCERTAINTY_BAND,
+                        help="Keyword score range that --cascade escalates to the LLM (inclusive)")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted run into the same output")
+    args = parser.parse_args()
+
+    input_format = file_format(args.input, args.input_format)
+    output_format = file_format(args.output, args.output_format)
+
+    service = None
+    if args.llm:
+        from llm_service import LLMService
+        service = LLMService()
+        if not service.api_key_available:
+            raise SystemExit("❌ --llm needs a configured LLM backend (set TOGETHER_API_KEY)")
+        service.cascade_band = tuple(args.band)
+    elif args.cascade:
+        raise SystemExit("❌ --cascade routes between local and LLM scoring; add --llm")
+
+    skip = completed_rows(args.output, output_format) if args.resume else 0
+    if skip:
+        print(f"↩️  Resuming after {skip:,} records already in {args.output}", file=sys.stderr)
+
+    with open(args.input, encoding='utf-8', newline='') as input_file:
+        records = islice(read_records(input_file, input_format), skip, None)
+        chunks = iter(lambda: list(islice(records, args.chunk_size)), [])
+        writer = ResultWriter(args.output, output_format, append=args.resume)
+        progress = Progress(input_file)
+        index = skip
+        scored = 0
+
+        def write_chunk(chunk, texts, future):
+            nonlocal index, scored
+            chunk_scores, seconds = future.result()
+            if args.cascade:
+                extra = cascade_scores(service, texts, chunk_scores, args.llm_concurrency, seconds / len(chunk))
+            elif service:
+                extra = llm_scores(service, texts, args.llm_concurrency)
+                for llm_columns in extra:
+                    llm_columns.pop('llm_seconds')
+            else:
+                extra = [{}] * len(chunk)
+            rows = []
+            for record, scores, llm_columns in zip(chunk, chunk_scores, extra):
+                row = {'record': index}
+                if args.id_column:
+                    row['id'] = record.get(args.id_column)
+                row.update(scores)
+                row.update(llm_columns)
+                rows.append(row)
+                index += 1
+            writer.write(rows)
+            scored += len(rows)
+            progress.update(scored)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=args.workers, initializer=_init_worker, initargs=(args.sentiment_engine, args.prospect_only, args.scoring_model)
+            ) as pool:
+                in_flight = deque()
+                for chunk in chunks:
+                    if args.text_column not in chunk[0]:
+                        raise SystemExit(f"❌ No '{args.text_column}' field in {args.input}; use --text-column")
+                    texts = [str(record.get(args.text_column) or '') for record in chunk]
+                    in_flight.append((chunk, texts, pool.submit(_score_chunk, texts)))
+                    # Bounded window: results are written in order while later chunks are scored
+                    if len(in_flight) >= args.workers * 2:
+                        write_chunk(*in_flight.popleft())
+                while in_flight:
+                    write_chunk(*in_flight.popleft())
+        finally:
+            writer.close()
+            progress.update(scored, final=True)
+
+    elapsed = time.perf_counter() - progress.start
+    print(f"✅ Scored {scored:,} records in {elapsed:.1f}s → {args.output}", file=sys.stderr)
+    if args.cascade:
+        print(f"🔀 Cascade band {args.band[0]:g}-{args.band[1]:g}:", file=sys.stderr)
+        for row in service.metrics.tier_rows():
+            print(f"   {row['tier']:<6} {row['analyses']:>8,} records ({row['share']:.1%})  "
+                  f"mean {row['mean_s']:.3f}s  p95 ≤ {row['p95_s']}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, Iterator, Tuple
+from config import SENTIMENT_LEXICON_PATH
+
+# Same fields and ranges as TextBlob's sentiment: polarity in [-1, 1], subjectivity in [0, 1]
+Sentiment = namedtuple('Sentiment', ['polarity', 'subjectivity'])
+# Sums over the individual assessments behind a Sentiment, so texts can be scored piece by piece
+SentimentTotals = namedtuple('SentimentTotals', ['polarity_sum', 'subjectivity_sum', 'count'])
+
+def sentiment_from_totals(totals: SentimentTotals) -> Sentiment:
+    """Average assessment totals into a Sentiment; no assessments is neutral"""
+    if not totals.count:
+        return Sentiment(0.0, 0.0)
+    return Sentiment(totals.polarity_sum / totals.count, totals.subjectivity_sum / totals.count)
+
+def add_totals(first: SentimentTotals, second: SentimentTotals) -> SentimentTotals:
+    return SentimentTotals(*(a + b for a, b in zip(first, second)))
+
+# TextBlob's default analyzer treats these as negations; apostrophes are split off first, so "n't" never matches
+SENTIMENT_NEGATIONS = frozenset(('no', 'not', "n't", 'never'))
+# Split from the start (without '.') and end of each whitespace-separated chunk, as TextBlob's tokenizer does
+_LEADING_PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_".replace('.', '')
+_TRAILING_PUNCTUATION = _LEADING_PUNCTUATION + '.'
+_CONTRACTION_RE = re.compile(r"(n't|'d|'m|'s|'ll|'re|'ve)")
+_QUOTE_RE = re.compile(r"([“”‘’'\"])")
+
+def load_sentiment_lexicon(path: str = SENTIMENT_LEXICON_PATH):
+    """Read a lexicon file written by export_textblob_lexicon.
+    
+    The file maps each word to [polarity, subjectivity, intensity, modifier],
+    where modifier marks TextBlob's adverbs, which scale the word after them,
+    and each emoticon (lowercased, plus "(!)" for irony) to its polarity.
+    Returns {word: (polarity, subjectivity, intensity)}, the set of
+    modifiers and {emoticon: polarity}.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    words = {word: tuple(values[:3]) for word, values in data['words'].items()}
+    modifiers = frozenset(word for word, values in data['words'].items() if values[3])
+    return words, modifiers, data['emoticons']
+
+def export_textblob_lexicon(path: str = SENTIMENT_LEXICON_PATH) -> int:
+    """Write TextBlob's English sentiment lexicon, as its analyzer sees it, to a JSON file.
+    
+    Scores are TextBlob's averages over each word's senses and parts of
+    speech, including the "-ly" adverbs it derives from adjectives. Forms
+    with spaces or apostrophes are left out, since its tokenizer never
+    produces them. Returns the number of words written.
+    """
+    from importlib.metadata import version
+    from textblob._text import EMOTICONS
+    from textblob.en import sentiment as textblob_lexicon
+    textblob_lexicon.load()
+    words = {
+        word: [*scores[None], any(pos in scores for pos in textblob_lexicon.modifiers)]
+        for word, scores in sorted(dict.items(textblob_lexicon))
+        if ' ' not in word and "'" not in word
+    }
+    # TextBlob matches emoticons lowercased, taking the first group that has one
+    emoticons = {}
+    for (_, polarity), group in EMOTICONS.items():
+        for emoticon in sorted(group):
+            emoticons.setdefault(emoticon.lower(), polarity)
+    emoticons['(!)'] = 0.0
+    # One word per line, so regenerating after a TextBlob upgrade gives a readable diff
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n  "source": ' + json.dumps(f"textblob {version('textblob')} en-sentiment.xml") + ',\n')
+        for name, entries in (('emoticons', emoticons), ('words', words)):
+            f.write(f'  "{name}": {{\n')
+            f.write(',\n'.join(f"    {json.dumps(key, ensure_ascii=False)}: {json.dumps(value)}" for key, value in entries.items()))
+            f.write('\n  },\n' if name == 'emoticons' else '\n  }\n')
+        f.write('}\n')
+    return len(words)
+
+def _tokens(text: str, emoticons: Dict[str, float]) -> Iterator[str]:
+    """Lowercased words, emoticons and the punctuation marks that matter to the scan, in the order TextBlob sees them"""
+    text = _QUOTE_RE.sub(r' \1 ', _CONTRACTION_RE.sub(r' \1', text))
+    for chunk in text.lower().split():
+        # Most chunks are plain words with no punctuation to split off
+        if chunk.isalnum() or chunk in emoticons:
+            yield chunk
+            continue
+        word = chunk.lstrip(_LEADING_PUNCTUATION)
+        # Leading marks are one character each; only "!" has an effect
+        yield from '!' * chunk[:len(chunk) - len(word)].count('!')
+        core = word.rstrip(_TRAILING_PUNCTUATION)
+        if core:
+            yield core
+        trailing = word[len(core):]
+        if trailing:
+            # An ellipsis is one token, long enough to end a modifier or negation
+            for mark in re.findall(r'\.\.\.|.', trailing):
+                if mark == '!' or mark == '...':
+                    yield mark
+
+class LexiconSentimentAnalyzer:
+    """Fast polarity/subjectivity scorer that reproduces TextBlob's default analyzer.
+
+    The lexicon is TextBlob's own English one, shipped as sentiment_lexicon.json
+    (see export_textblob_lexicon), and the scan follows TextBlob's rules: each
+    known word is one assessment, an adverb scales the word after it by its
+    intensity, a negation ("not a good") flips and halves polarity, and "!"
+    boosts the last assessment; emoticons written apart from words and "(!)"
+    are assessments of their own. The result is the mean over assessments,
+    as in TextBlob's part-of-speech-free string path. Without TextBlob's
+    object-heavy tokenizer, a text costs one pass of plain dict lookups.
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, path: str = SENTIMENT_LEXICON_PATH, negations: frozenset = SENTIMENT_NEGATIONS):
+        self._words, self._modifiers, self._emoticons = load_sentiment_lexicon(path)
+        self._negations = negations
+
+    def sentiment(self, text: str) -> Sentiment:
+        """Score one text"""
+        return sentiment_from_totals(self.assess(text))
+
+    def assess(self, text: str) -> SentimentTotals:
+        """Sum the assessments in one text"""
+        words, modifiers, negations, emoticons = self._words, self._modifiers, self._negations, self._emoticons
+        # Each assessment is [polarity, subjectivity, intensity, negated]
+        assessments = []
+        modifier = negation = None
+        for token in _tokens(text, emoticons):
+            scores = words.get(token)
+            if scores is not None:
+                polarity, subjectivity, intensity = scores
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, False])
+                else:
+                    # "very good" is one assessment: the adverb's intensity times the word's scores
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], 1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], 1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+                modifier = token if token in modifiers else None
+                negation = token if token in negations else None
+                continue
+            if token in negations:
+                negation = token
+            elif negation and len(token) > 1:
+                # Negation carries across short words only ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith('ly'):
+                # "really not good": the negation applies to the adverb's assessment
+                assessments[-1][3] = True
+                negation = None
+            elif modifier and len(token) > 2:
+                modifier = None
+            if token == '!' and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+            elif token in emoticons:
+                assessments.append([emoticons[token], 1.0, 1.0, False])
+        if not assessments:
+            return SentimentTotals(0.0, 0.0, 0)
+        return SentimentTotals(
+            sum(polarity * -0.5 if negated else polarity for polarity, _, _, negated in assessments),
+            sum(subjectivity for _, subjectivity, _, _ in assessments),
+            len(assessments)
+        )
+
+class TextBlobSentimentAnalyzer:
+    """TextBlob's default analyzer; textblob is imported on first use"""
+
+    name = 'textblob'
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._textblob = TextBlob
+
+    def sentiment(self, text: str) -> Sentiment:
+        return Sentiment(*self._textblob(text).sentiment)
+
+    def assess(self, text: str) -> SentimentTotals:
+        """Sum the assessments in one text"""
+        # Each assessment is (words, polarity, subjectivity, labels)
+        assessments = self._textblob(text).sentiment_assessments.assessments
+        return SentimentTotals(
+            sum(assessment[1] for assessment in assessments),
+            sum(assessment[2] for assessment in assessments),
+            len(assessments)
+        )
+
+SENTIMENT_ENGINES = {
+    'lexicon': LexiconSentimentAnalyzer,
+    'textblob': TextBlobSentimentAnalyzer
+}
+
+@lru_cache(maxsize=None)
+def get_sentiment_analyzer(name: str):
+    """Return the sentiment engine registered under name, built once per process"""
+    if name not in SENTIMENT_ENGINES:
+        raise ValueError(f"Unknown sentiment engine {name!r}; expected one of {', '.join(SENTIMENT_ENGINES)}")
+    return SENTIMENT_ENGINES[name]()
+
+def main():
+    """Regenerate the shipped lexicon file from the installed TextBlob"""
+    parser = argparse.ArgumentParser(description="Export TextBlob's sentiment lexicon for the lexicon engine")
+    parser.add_argument('output', nargs='?', default=SENTIMENT_LEXICON_PATH)
+    args = parser.parse_args()
+    count = export_textblob_lexicon(args.output)
+    print(f"✅ Wrote {count:,} words → {args.output}")
+
+if __name__ == "__main__":
+    main()
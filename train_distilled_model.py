@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Distill LLM lead labels into a local model
+
+Trains a DistilledLeadModel (hashed n-grams + logistic regression, NumPy
+only) on transcripts labelled by the LLM and saves it as .npz:
+    python train_distilled_model.py labelled_calls.jsonl lead_model.npz
+    python train_distilled_model.py scored_calls.csv lead_model.npz --holdout 0.2 --epochs 300
+
+labelled_calls.jsonl can come from the analyses saved in the app:
+    python history_store.py export-labelled labelled_calls.jsonl
+
+Each record needs the transcript (--text-column) plus any of buying_intent, urgency_level,
+engagement_level and lead_score, either as top-level fields or nested like
+LLMService results ({"analysis": {...}, "score": {"overall_score": ...}}).
+Use the model with LEAD_SCORING_MODEL=lead_model.npz, or
+LeadAnalyzer(scoring_model='lead_model.npz').
+"""
+
+import argparse
+import random
+import sys
+import time
+from distilled_model import CATEGORY_LABELS, SCORE_LABEL, DistilledLeadModel, label_columns
+from score_conversations import file_format, read_records
+
+def main():
+    """Parse arguments, train the model and save it"""
+    parser = argparse.ArgumentParser(description="Train a local lead model on LLM-labelled transcripts")
+    parser.add_argument('input', help="CSV or JSONL file of labelled transcripts")
+    parser.add_argument('output', help="Path for the trained model (.npz)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    parser.add_argument('--text-column', default='conversation', help="Field holding the transcript")
+    parser.add_argument('--prospect-only', action='store_true', help="Train on the non-rep turns only")
+    parser.add_argument('--hash-bits', type=int, default=18, help="Feature space size as a power of two")
+    parser.add_argument('--max-ngram', type=int, default=2, help="Longest word n-gram to hash")
+    parser.add_argument('--epochs', type=int, default=200)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--l2', type=float, default=1e-5, help="L2 penalty on the weights")
+    parser.add_argument('--holdout', type=float, default=0.0, help="Fraction of records kept back for evaluation")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.input, encoding='utf-8', newline='') as f:
+        records = [
+            record for record in read_records(f, file_format(args.input, args.input_format))
+            if record.get(args.text_column)
+        ]
+    if not records:
+        raise SystemExit(f"❌ No records with a '{args.text_column}' field in {args.input}; use --text-column")
+
+    if args.prospect_only:
+        from lead_analyzer import LeadAnalyzer
+        scored_text = LeadAnalyzer(prospect_only=True, scoring_model=None).scored_text
+    else:
+        scored_text = str
+
+    random.Random(args.seed).shuffle(records)
+    held_out = int(len(records) * args.holdout)
+    train, test = records[held_out:], records[:held_out]
+
+    labels = label_columns(train)
+    print(f"🧠 Training on {len(train):,} transcripts")
+    for label in CATEGORY_LABELS + (SCORE_LABEL,):
+        print(f"   {label:<18} {sum(value is not None for value in labels[label]):,} labelled")
+
+    start = time.perf_counter()
+    model = DistilledLeadModel(n_features=2 ** args.hash_bits, ngram_range=(1, args.max_ngram))
+    model.fit([scored_text(str(record[args.text_column])) for record in train], labels,
+              epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+    if not model.heads:
+        raise SystemExit("❌ No LLM labels found; expected buying_intent, urgency_level, engagement_level or lead_score")
+    print(f"✅ Trained {', '.join(model.heads)} in {time.perf_counter() - start:.1f}s")
+
+    if test:
+        metrics = model.evaluate([scored_text(str(record[args.text_column])) for record in test], label_columns(test))
+        print(f"📊 Holdout ({len(test):,} transcripts):")
+        for name, value in metrics.items():
+            print(f"   {name:<28} {value:.3f}")
+
+    model.save(args.output)
+    print(f"💾 Saved model → {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
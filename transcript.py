@@ -0,0 +1,84 @@
+import math
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+# One speaker turn. `text` is transcript[start:end], so keyword positions found in
+# it map straight back to the original; `tokens` estimates the text's prompt tokens.
+Turn = namedtuple('Turn', ['speaker', 'role', 'text', 'start', 'end', 'tokens'])
+
+# Speaker labels (lowercased) mapped to roles; other labels are 'other', unlabelled text 'unknown'
+SPEAKER_ROLES = {
+    'sales rep': 'rep', 'rep': 'rep', 'salesperson': 'rep', 'agent': 'rep', 'seller': 'rep', 'ae': 'rep', 'sdr': 'rep',
+    'prospect': 'prospect', 'customer': 'prospect', 'client': 'prospect', 'lead': 'prospect', 'buyer': 'prospect'
+}
+
+# "Sales Rep: ..." at the start of a line; up to three words, and not a URL scheme.
+# Only known roles or labels used on at least two lines count, so prose like "Note: ..." does not.
+_LABEL_PATTERN = re.compile(r"[ \t]*([A-Za-z][\w.'&-]*(?:[ \t]+[\w.'&-]+){0,2})[ \t]*:(?!//)[ \t]*")
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text without a tokenizer.
+
+    Counts words and punctuation marks, then adds a margin for words that
+    split into several sub-word tokens; never less than one token per 4 characters.
+    """
+    if not text:
+        return 0
+    pieces = len(_TOKEN_PATTERN.findall(text))
+    return max(math.ceil(pieces * 1.2), math.ceil(len(text) / 4))
+
+@lru_cache(maxsize=256)
+def parse_transcript(conversation: str) -> Tuple[Turn, ...]:
+    """Split a transcript into speaker turns.
+
+    A line starting with a short "Speaker:" label opens a new turn; other
+    non-blank lines continue the current one. A label must be a known role
+    (see SPEAKER_ROLES) or open at least two lines, so one-off prose such as
+    "The problem is: ..." stays in the current turn. Text before the first label,
+    or a transcript with no labels at all, becomes a turn with no speaker.
+    Results are cached, so every stage analyzing the same conversation
+    shares one parse.
+    """
+    turns = []
+    speaker = None
+    start = end = None
+
+    def close_turn():
+        if speaker is not None or start is not None:
+            text = conversation[start:end] if start is not None else ''
+            role = SPEAKER_ROLES.get(speaker.lower(), 'other') if speaker else 'unknown'
+            turns.append(Turn(speaker or '', role, text, start if start is not None else end, end, estimate_tokens(text)))
+
+    lines = conversation.splitlines(keepends=True)
+    labels = [_LABEL_PATTERN.match(line.rstrip()) for line in lines]
+    uses = Counter(label.group(1).lower() for label in labels if label)
+    position = 0
+    for line, label in zip(lines, labels):
+        content = line.rstrip()
+        if label and (label.group(1).lower() in SPEAKER_ROLES or uses[label.group(1).lower()] >= 2):
+            close_turn()
+            speaker = label.group(1)
+            start = position + label.end() if label.end() < len(content) else None
+            end = position + label.end()
+            if start is not None:
+                end = position + len(content)
+        elif content.strip():
+            if start is None:
+                start = position + len(content) - len(content.lstrip())
+            end = position + len(content)
+        position += len(line)
+    close_turn()
+    return tuple(turns)
+
+def format_turn(turn: Turn) -> str:
+    """Render a turn as "Speaker: text" with per-line indentation stripped"""
+    lines = (line.strip() for line in turn.text.splitlines())
+    text = '\n'.join(line for line in lines if line)
+    return f"{turn.speaker}: {text}" if turn.speaker else text
+
+def exclude_rep(turns: Iterable[Turn]) -> Tuple[Turn, ...]:
+    """Keep everything except the sales rep's own turns"""
+    return tuple(turn for turn in turns if turn.role != 'rep')